@@ -1,19 +1,41 @@
 # app.py - Updated Flask application with user authentication and ticket system
-from flask import Flask, render_template, request, jsonify, session, flash, redirect, url_for, abort
+from flask import Flask, render_template, request, jsonify, session, flash, redirect, url_for, abort, Response, stream_with_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_migrate import Migrate
 from werkzeug.security import check_password_hash
+from sqlalchemy import select, insert, func, event, tuple_
+from sqlalchemy.orm import selectinload, raiseload
+from sqlalchemy.exc import IntegrityError
 import os
 import json
 import logging
-from datetime import datetime
-import uuid
+import functools
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+import secrets
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Load environment variables FIRST
 from dotenv import load_dotenv
 load_dotenv()
 
+from cachelib import FileSystemCache
+from jinja2 import FileSystemBytecodeCache
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from config import Config, ProductionConfig
+
 # Import models and forms
 from models import db, User, Ticket, TicketMessage, Conversation, ConversationMessage, DumpAnalysis, KnowledgeBaseSolution, SolutionFeedback
 from forms import RegistrationForm, LoginForm, SupportTicketForm, UserProfileForm, ChangePasswordForm, TicketMessageForm, FeedbackForm
@@ -43,11 +65,69 @@ if database_url.startswith("postgres://"):
 
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Pool sizing and query recording follow the FLASK_CONFIG class; production
+# runs more workers and skips the per-query debug records
+selected_config = ProductionConfig if os.getenv('FLASK_CONFIG') == 'production' else Config
+app.config['SQLALCHEMY_RECORD_QUERIES'] = selected_config.SQLALCHEMY_RECORD_QUERIES
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(selected_config.SQLALCHEMY_ENGINE_OPTIONS)
+if database_url.startswith('sqlite'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update(selected_config.SQLITE_ENGINE_OPTIONS)
 app.config['DEBUG'] = os.getenv('FLASK_ENV') == 'development'
+app.config['MAX_MESSAGE_HISTORY'] = 50
+
+# Cache compiled templates on disk so they aren't re-parsed per worker,
+# and only check template sources for changes while developing
+jinja_cache_dir = os.path.join(app.instance_path, 'jinja_cache')
+os.makedirs(jinja_cache_dir, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
+app.jinja_env.auto_reload = app.config['DEBUG']
+
+@app.template_filter('epoch_iso')
+def epoch_iso(value):
+    """Format an epoch timestamp (e.g. a dump file's mtime) as ISO 8601"""
+    return iso_second(int(value)) if value is not None else ''
+
+@functools.lru_cache(maxsize=1024)
+def iso_second(seconds):
+    # Dump mtimes cluster within the same second, so format each second once
+    return datetime.fromtimestamp(seconds).isoformat(timespec='seconds')
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to Flask's default for other types"""
+    
+    def dumps(self, obj, **kwargs):
+        # Pass datetimes through so they keep Flask's HTTP date format
+        return orjson.dumps(
+            obj,
+            default=self.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
 
 # Initialize extensions
 db.init_app(app)
 migrate = Migrate(app, db)
+
+def _sqlite_pragmas(dbapi_conn, connection_record):
+    """Use WAL and relaxed syncing so commits append to the log instead of syncing the DB"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")  # SQLite only honours ON DELETE CASCADE with this
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA mmap_size=134217728")
+    cursor.close()
+
+with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        event.listen(db.engine, 'connect', _sqlite_pragmas)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
@@ -56,9 +136,12 @@ login_manager.login_message_category = 'info'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return db.session.get(User, int(user_id))
 
-# Initialize logging
+# Initialize logging (thread/process names are not part of the format)
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 logging.basicConfig(
     filename='logs/app.log',
     level=logging.INFO,
@@ -87,10 +170,110 @@ def safe_init(component_class, name):
         logging.error(f"Error initializing {name}: {str(e)}")
         return None
 
-dump_analyzer = safe_init(DumpAnalyzer, "DumpAnalyzer")
-file_scanner = safe_init(FileScanner, "FileScanner")
-knowledge_base = safe_init(KnowledgeBase, "KnowledgeBase")
-gemini_assistant = safe_init(GeminiAssistant, "GeminiAssistant")
+# Components are created on first use, so requests that never touch them
+# (login, profile, tickets) don't pay for loading them
+@functools.cache
+def get_dump_analyzer():
+    return safe_init(DumpAnalyzer, "DumpAnalyzer")
+
+@functools.cache
+def get_file_scanner():
+    return safe_init(FileScanner, "FileScanner")
+
+@functools.cache
+def get_knowledge_base():
+    return safe_init(KnowledgeBase, "KnowledgeBase")
+
+@functools.cache
+def get_gemini_assistant():
+    return safe_init(GeminiAssistant, "GeminiAssistant")
+
+def reload_knowledge_base(signum=None, frame=None):
+    """Swap in a freshly loaded KnowledgeBase, e.g. after errors.json is edited"""
+    if KnowledgeBase:
+        KnowledgeBase.clear_cache()
+    get_knowledge_base.cache_clear()
+    health_components.cache_clear()
+    get_knowledge_base()
+
+# SIGHUP doesn't exist on Windows; there only a restart picks up edits
+if hasattr(signal, 'SIGHUP'):
+    signal.signal(signal.SIGHUP, reload_knowledge_base)
+
+# With `gunicorn --preload`, loading here parses the knowledge base once in the
+# master and the forked workers share it instead of each parsing their own copy
+if os.getenv('PRELOAD_KNOWLEDGE_BASE', 'false').lower() == 'true':
+    get_knowledge_base()
+
+# Calls to the support dashboard run here so they never block a request
+support_executor = ThreadPoolExecutor(max_workers=4)
+
+# Scan results are kept server-side and looked up by scan id, so they
+# never have to travel through the results page URL
+scan_cache = FileSystemCache(os.path.join(app.instance_path, 'scan_cache'), default_timeout=900)
+
+# Shared HTTP session so connections to the support dashboard are reused
+SUPPORT_HTTP = requests.Session()
+SUPPORT_HTTP.headers.update({'Content-Type': 'application/json'})
+_support_adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+)
+SUPPORT_HTTP.mount('https://', _support_adapter)
+SUPPORT_HTTP.mount('http://', _support_adapter)
+
+class CircuitBreaker:
+    """Skip calls to a failing service for a cool-down period after repeated failures"""
+    
+    def __init__(self, fail_max=5, reset_timeout=30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+    
+    def allow(self):
+        """Return True if a call may be attempted now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Let one trial call through; a failure re-opens the circuit immediately
+                self._opened_at = None
+                self._failures = self.fail_max - 1
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+
+support_api_breaker = CircuitBreaker(fail_max=5, reset_timeout=30)
+
+def encode_support_payload(payload):
+    """Serialize a support API payload, letting the encoder format datetimes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(payload)
+    return json.dumps(payload, default=datetime.isoformat)
+
+def unique_violation_field(error):
+    """Return which unique users column ('username' or 'email') an IntegrityError hit"""
+    orig = getattr(error, 'orig', None)
+    # Postgres reports the constraint name; SQLite reports "UNIQUE constraint failed: users.<column>"
+    constraint = getattr(getattr(orig, 'diag', None), 'constraint_name', None) or ''
+    message = f"{constraint} {orig}"
+    for field in ('username', 'email'):
+        if f'users.{field}' in message or f'users_{field}' in message:
+            return field
+    return None
 
 # Authentication Routes
 @app.route('/register', methods=['GET', 'POST'])
@@ -129,6 +312,16 @@ def register():
             flash('Registration successful! Please log in.', 'success')
             return redirect(url_for('login'))
             
+        except IntegrityError as e:
+            db.session.rollback()
+            field = unique_violation_field(e)
+            if field == 'username':
+                form.username.errors.append('Username already exists. Please choose a different one.')
+            elif field == 'email':
+                form.email.errors.append('Email already registered. Please use a different email or login.')
+            else:
+                logging.error(f"Registration error: {str(e)}")
+                flash('An error occurred during registration. Please try again.', 'error')
         except Exception as e:
             db.session.rollback()
             logging.error(f"Registration error: {str(e)}")
@@ -144,11 +337,13 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
-        # Try to find user by username or email
-        user = User.query.filter(
-            (User.username == form.username.data) | 
-            (User.email == form.username.data.lower())
-        ).first()
+        # Look the user up by email or username (usernames can't contain '@'),
+        # so each login is a single indexed equality lookup
+        identifier = form.username.data
+        if '@' in identifier:
+            user = User.query.filter_by(email=identifier.lower()).first()
+        else:
+            user = User.query.filter_by(username=identifier).first()
         
         if user and user.check_password(form.password.data):
             user.last_login = datetime.utcnow()
@@ -233,6 +428,16 @@ def edit_profile():
             flash('Your profile has been updated successfully.', 'success')
             return redirect(url_for('profile'))
             
+        except IntegrityError as e:
+            db.session.rollback()
+            field = unique_violation_field(e)
+            if field == 'username':
+                form.username.errors.append('Username already exists. Please choose a different one.')
+            elif field == 'email':
+                form.email.errors.append('Email already registered. Please use a different email.')
+            else:
+                logging.error(f"Profile update error: {str(e)}")
+                flash('An error occurred while updating your profile.', 'error')
         except Exception as e:
             db.session.rollback()
             logging.error(f"Profile update error: {str(e)}")
@@ -264,19 +469,26 @@ def change_password():
 def index():
     """Main dashboard page"""
     try:
-        # Get user's recent activity
-        recent_analyses = DumpAnalysis.query.filter_by(user_id=current_user.id)\
-                                           .order_by(DumpAnalysis.created_at.desc())\
-                                           .limit(5).all()
+        # Get user's recent activity; the window count gives the overall
+        # total alongside the limited rows, so no separate COUNT query
+        rows = db.session.execute(
+            select(DumpAnalysis, func.count().over().label('total'))
+            .where(DumpAnalysis.user_id == current_user.id)
+            .order_by(DumpAnalysis.created_at.desc())
+            .limit(5)
+        ).all()
+        recent_analyses = [row[0] for row in rows]
+        total_analyses = rows[0][1] if rows else 0
         
         # Get recent tickets
-        recent_tickets = Ticket.query.filter_by(user_id=current_user.id)\
-                                   .order_by(Ticket.created_at.desc())\
-                                   .limit(3).all()
-        
-        # Get system stats
-        total_analyses = DumpAnalysis.query.filter_by(user_id=current_user.id).count()
-        total_tickets = Ticket.query.filter_by(user_id=current_user.id).count()
+        rows = db.session.execute(
+            select(Ticket, func.count().over().label('total'))
+            .where(Ticket.user_id == current_user.id)
+            .order_by(Ticket.created_at.desc())
+            .limit(3)
+        ).all()
+        recent_tickets = [row[0] for row in rows]
+        total_tickets = rows[0][1] if rows else 0
         
         return render_template('dashboard/index.html', 
                              recent_analyses=recent_analyses,
@@ -295,130 +507,226 @@ def index():
 @app.route('/scan', methods=['POST'])
 @login_required
 def scan_dumps():
-    """Initiate dump file scan"""
+    """Initiate dump file scan, streaming one NDJSON line per analyzed file"""
+    user = current_user._get_current_object()
+    user_id = user.id
     try:
-        logging.info(f"Starting dump file scan for user: {current_user.username}")
+        logging.info("Starting dump file scan for user: %s", user.username)
         
+        file_scanner = get_file_scanner()
         if not file_scanner:
             logging.error("File scanner not available")
             return jsonify({"status": "error", "message": "File scanner not available"}), 500
         
         # Scan for dump files
         scan_results = file_scanner.scan_directories()
-        logging.info(f"Scan found {len(scan_results) if scan_results else 0} files")
+        logging.info("Scan found %d files", len(scan_results) if scan_results else 0)
         
         if not scan_results:
             return jsonify({"status": "no_files", "message": "No dump files found"})
         
-        # Analyze found dump files
-        analysis_results = []
-        for i, dump_file in enumerate(scan_results):
-            try:
-                logging.info(f"Processing file {i+1}/{len(scan_results)}: {dump_file.get('filename', 'unknown')}")
-                
-                # Check if this file was already analyzed
-                existing_analysis = DumpAnalysis.query.filter_by(
-                    user_id=current_user.id,
-                    file_path=dump_file['path']
-                ).first()
+        # Load previous analyses for all found files in one query per chunk
+        # (chunked to stay under SQLite's bound-variable limit)
+        paths = [d['path'] for d in scan_results]
+        existing = {}
+        for start in range(0, len(paths), 500):
+            for a in DumpAnalysis.query.filter(
+                DumpAnalysis.user_id == user_id,
+                DumpAnalysis.file_path.in_(paths[start:start + 500])
+            ).all():
+                existing[a.file_path] = a
+        
+    except Exception as e:
+        logging.error(f"Error during scan: {str(e)}")
+        return jsonify({"status": "error", "message": f"Scan failed: {str(e)}"}), 500
+    
+    return Response(stream_with_context(stream_scan_results(user_id, scan_results, existing)),
+                    mimetype='application/x-ndjson')
+
+def stream_scan_results(user_id, scan_results, existing):
+    """Analyze scanned dump files, yielding an NDJSON line as each one finishes"""
+    total = len(scan_results)
+    pending = []
+    kb_cache = {}
+    results = {}
+    count = 0
+    saved = True
+    
+    def result_line(i, analysis):
+        results[i] = analysis
+        return app.json.dumps({"status": "result", "index": i, "total": total, "result": analysis}) + "\n"
+    
+    # Previously analyzed files are available immediately
+    prefetch_solutions([analysis.error_code for analysis in existing.values()], kb_cache)
+    for i, dump_file in enumerate(scan_results):
+        existing_analysis = existing.get(dump_file['path'])
+        if existing_analysis:
+            analysis = {
+                'file_info': dump_file,
+                'error_code': existing_analysis.error_code,
+                'error_name': existing_analysis.error_name,
+                'category': existing_analysis.category,
+                'confidence': existing_analysis.confidence,
+                'analyzer_method': existing_analysis.analyzer_method,
+                'faulting_module': existing_analysis.faulting_module,
+                'process_name': existing_analysis.process_name,
+                'analysis_time': existing_analysis.created_at.isoformat()
+            }
+            add_solutions(analysis, kb_cache)
+            count += 1
+            yield result_line(i, analysis)
+    
+    # Run the new analyses concurrently. WinDbg runs as a subprocess and the
+    # fallback analysis is file I/O, so threads overlap well. Database work
+    # stays on the request thread since the session is not thread-safe.
+    to_analyze = [(i, df) for i, df in enumerate(scan_results) if df['path'] not in existing]
+    if to_analyze:
+        dump_analyzer = get_dump_analyzer()
+        # Dumps go to the analyzer in batches so each WinDbg process covers several files
+        batch_size = dump_analyzer.config.WINDBG_BATCH_SIZE if dump_analyzer else 1
+        batches = [to_analyze[k:k + batch_size] for k in range(0, len(to_analyze), batch_size)]
+        # Nothing here needs to read back pending rows, so skip autoflush and
+        # write the queued analyses in batches instead
+        with db.session.no_autoflush, ThreadPoolExecutor(max_workers=min(8, len(batches))) as executor:
+            futures = {executor.submit(analyze_dump_files, dump_analyzer, [df for _, df in batch]): batch
+                       for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    analyses = future.result()
+                except Exception as e:
+                    logging.error("Error analyzing %d dumps: %s", len(batch), e)
+                    analyses = [failed_analysis(df, e) for _, df in batch]
                 
-                if existing_analysis:
-                    # Use existing analysis
-                    analysis = {
-                        'file_info': dump_file,
-                        'error_code': existing_analysis.error_code,
-                        'error_name': existing_analysis.error_name,
-                        'category': existing_analysis.category,
-                        'confidence': existing_analysis.confidence,
-                        'analyzer_method': existing_analysis.analyzer_method,
-                        'faulting_module': existing_analysis.faulting_module,
-                        'process_name': existing_analysis.process_name,
-                        'analysis_time': existing_analysis.created_at.isoformat()
-                    }
-                else:
-                    # Perform new analysis
-                    if dump_analyzer:
-                        analysis = dump_analyzer.analyze_dump(dump_file)
-                    else:
-                        analysis = {
-                            'file_info': dump_file,
-                            'error_code': 'Unknown',
-                            'error_name': 'Analysis unavailable',
-                            'analysis_time': datetime.now().isoformat(),
-                            'analyzer_method': 'none',
-                            'confidence': 'low'
-                        }
+                prefetch_solutions([analysis.get('error_code') for analysis in analyses
+                                    if analysis and analysis.get('analyzer_method') != 'failed'], kb_cache)
+                for (i, dump_file), analysis in zip(batch, analyses):
+                    logging.info("Processing file %d/%d: %s", i + 1, total, dump_file.get('filename', 'unknown'))
+                    if not analysis:
+                        continue
                     
-                    # Save analysis to database
-                    if analysis and analysis.get('error_code') != 'Unknown':
-                        dump_analysis = DumpAnalysis(
-                            user_id=current_user.id,
-                            file_path=dump_file['path'],
-                            filename=dump_file['filename'],
-                            file_size=dump_file['size'],
-                            error_code=analysis.get('error_code'),
-                            error_name=analysis.get('error_name'),
-                            category=analysis.get('category'),
-                            confidence=analysis.get('confidence'),
-                            analyzer_method=analysis.get('analyzer_method'),
-                            faulting_module=analysis.get('faulting_module'),
-                            process_name=analysis.get('process_name')
-                        )
-                        dump_analysis.set_analysis_data(analysis)
-                        db.session.add(dump_analysis)
-                
-                if analysis:
-                    # Search knowledge base for solutions
-                    if knowledge_base and analysis.get('error_code') != 'Unknown':
+                    if analysis.get('analyzer_method') != 'failed':
                         try:
-                            solutions = knowledge_base.search_solutions(analysis['error_code'])
-                            analysis['solutions'] = solutions
+                            # Save analysis to database
+                            if analysis.get('error_code') != 'Unknown':
+                                dump_analysis = DumpAnalysis(
+                                    user_id=user_id,
+                                    file_path=dump_file['path'],
+                                    filename=dump_file['filename'],
+                                    file_size=dump_file['size'],
+                                    error_code=analysis.get('error_code'),
+                                    error_name=analysis.get('error_name'),
+                                    category=analysis.get('category'),
+                                    confidence=analysis.get('confidence'),
+                                    analyzer_method=analysis.get('analyzer_method'),
+                                    faulting_module=analysis.get('faulting_module'),
+                                    process_name=analysis.get('process_name')
+                                )
+                                dump_analysis.set_analysis_data(analysis)
+                                pending.append(dump_analysis)
+                                if len(pending) >= 100:
+                                    saved = save_pending_analyses(pending) and saved
+                            
+                            add_solutions(analysis, kb_cache)
+                            
                         except Exception as e:
-                            logging.error(f"Error searching knowledge base: {str(e)}")
-                            analysis['solutions'] = None
-                    else:
-                        analysis['solutions'] = None
+                            logging.error("Error analyzing %s: %s", dump_file, e)
+                            analysis = failed_analysis(dump_file, e)
                     
-                    analysis_results.append(analysis)
-                    
-            except Exception as e:
-                logging.error(f"Error analyzing {dump_file}: {str(e)}")
-                analysis_results.append({
-                    'file_info': dump_file,
-                    'error_code': 'Error',
-                    'error_name': f'Analysis failed: {str(e)}',
-                    'analysis_time': datetime.now().isoformat(),
-                    'analyzer_method': 'failed',
-                    'confidence': 'none',
-                    'solutions': None
-                })
-        
-        # Commit any new analyses
+                    count += 1
+                    yield result_line(i, analysis)
+    
+    # Write any remaining analyses
+    saved = save_pending_analyses(pending) and saved
+    
+    logging.info("Scan completed. Analyzed %d dumps", count)
+    
+    scan_id = secrets.token_hex(16)
+    scan_cache.set(f"scan:{user_id}:{scan_id}", [results[i] for i in sorted(results)])
+    
+    # "partial" still carries the results; only some history rows were not stored
+    yield app.json.dumps({"status": "success" if saved else "partial",
+                          "count": count, "scan_id": scan_id}) + "\n"
+
+def save_pending_analyses(pending):
+    """Bulk-insert and commit queued DumpAnalysis rows, then clear the queue.
+    
+    Each batch is its own transaction, so a failure loses only that batch.
+    Returns False if the batch could not be saved.
+    """
+    if not pending:
+        return True
+    try:
+        db.session.bulk_save_objects(pending)
+        db.session.commit()
+        return True
+    except Exception as e:
+        logging.error("Error saving %d analyses: %s", len(pending), e)
+        db.session.rollback()
+        return False
+    finally:
+        pending.clear()
+
+def analyze_dump_files(dump_analyzer, dump_files):
+    """Analyze a batch of dump files (safe to run on a worker thread)"""
+    if dump_analyzer:
+        return dump_analyzer.analyze_dumps(dump_files)
+    return [{
+        'file_info': dump_file,
+        'error_code': 'Unknown',
+        'error_name': 'Analysis unavailable',
+        'analysis_time': datetime.now().isoformat(),
+        'analyzer_method': 'none',
+        'confidence': 'low'
+    } for dump_file in dump_files]
+
+def failed_analysis(dump_file, error):
+    """Result entry for a dump whose analysis raised"""
+    return {
+        'file_info': dump_file,
+        'error_code': 'Error',
+        'error_name': f'Analysis failed: {str(error)}',
+        'analysis_time': datetime.now().isoformat(),
+        'analyzer_method': 'failed',
+        'confidence': 'none',
+        'solutions': None
+    }
+
+def prefetch_solutions(codes, kb_cache):
+    """Look up the error codes not yet in kb_cache with one knowledge base call"""
+    knowledge_base = get_knowledge_base()
+    missing = [code for code in dict.fromkeys(codes)
+               if code and code != 'Unknown' and code not in kb_cache]
+    if knowledge_base and missing:
         try:
-            db.session.commit()
+            kb_cache.update(zip(missing, knowledge_base.search_solutions_many(missing)))
         except Exception as e:
-            logging.error(f"Error saving analyses: {str(e)}")
-            db.session.rollback()
-        
-        logging.info(f"Scan completed. Analyzed {len(analysis_results)} dumps")
-        
-        return jsonify({
-            "status": "success",
-            "results": analysis_results,
-            "count": len(analysis_results)
-        })
-        
-    except Exception as e:
-        logging.error(f"Error during scan: {str(e)}")
-        return jsonify({"status": "error", "message": f"Scan failed: {str(e)}"}), 500
+            logging.error("Error searching knowledge base: %s", e)
+
+def add_solutions(analysis, kb_cache):
+    """Attach knowledge base solutions to an analysis, looking each error code up once"""
+    knowledge_base = get_knowledge_base()
+    if knowledge_base and analysis.get('error_code') != 'Unknown':
+        try:
+            # Many dumps share a bug check code
+            code = analysis['error_code']
+            if code not in kb_cache:
+                kb_cache[code] = knowledge_base.search_solutions(code)
+            analysis['solutions'] = kb_cache[code]
+        except Exception as e:
+            logging.error("Error searching knowledge base: %s", e)
+            analysis['solutions'] = None
+    else:
+        analysis['solutions'] = None
 
 @app.route('/scan_results')
 @login_required
 def scan_results():
     """Display scan results page"""
-    results = request.args.get('results', '[]')
-    try:    
-        results_data = json.loads(results) if results != '[]' else []
+    scan_id = request.args.get('scan_id', '')
+    try:
+        results_data = scan_cache.get(f"scan:{current_user.id}:{scan_id}") if scan_id else None
+        results_data = results_data or []
         return render_template('scan_results.html', results=results_data)
     except Exception as e:
         logging.error(f"Error loading scan results: {str(e)}")
@@ -439,22 +747,22 @@ def support():
         form.error_code.data = error_code
         form.title.data = f"Issue with error code {error_code}"
     
-    # Debug CSRF
-    print(f"CSRF token: {form.csrf_token.current_token}")
-    
     return render_template('support/support.html', form=form, conversation_id=conversation_id)
 
 @app.route('/submit_support', methods=['POST'])
 @login_required
 def submit_support():
     """Submit support request - FIXED VERSION"""
+    user = current_user._get_current_object()
+    user_id = user.id
+    username = user.username
     form = SupportTicketForm()
     
     if form.validate_on_submit():
         try:
             # Create support ticket
             ticket = Ticket(
-                user_id=current_user.id,
+                user_id=user_id,
                 title=form.title.data,
                 description=form.description.data,
                 error_code=form.error_code.data or None,
@@ -466,26 +774,27 @@ def submit_support():
             db.session.flush()  # Get the ticket ID
             
             # Add initial system message (your existing code)
-            system_message = f"Ticket created by {current_user.username}\n"
+            parts = [f"Ticket created by {username}\n"]
             if hasattr(form, 'steps_tried') and form.steps_tried.data:
-                system_message += f"\nSteps already tried:\n{form.steps_tried.data}"
+                parts.append(f"\nSteps already tried:\n{form.steps_tried.data}")
             
             # Add system configuration
-            config = current_user.get_system_config_dict()
+            config = user.get_system_config_dict()
             if config:
-                system_message += f"\n\nSystem Configuration:\n"
-                system_message += f"OS: {config.get('os_version', 'Not specified')}\n"
-                system_message += f"Processor: {config.get('processor', 'Not specified')}\n"
-                system_message += f"RAM: {config.get('ram_size', 'Not specified')}\n"
-                system_message += f"Storage: {config.get('storage_type', 'Not specified')}\n"
+                parts.append("\n\nSystem Configuration:\n")
+                parts.append(f"OS: {config.get('os_version', 'Not specified')}\n")
+                parts.append(f"Processor: {config.get('processor', 'Not specified')}\n")
+                parts.append(f"RAM: {config.get('ram_size', 'Not specified')}\n")
+                parts.append(f"Storage: {config.get('storage_type', 'Not specified')}\n")
                 if config.get('graphics_card') and config.get('graphics_card') != 'Not specified':
-                    system_message += f"Graphics: {config.get('graphics_card')}\n"
+                    parts.append(f"Graphics: {config.get('graphics_card')}\n")
                 if config.get('additional_info'):
-                    system_message += f"Additional Info: {config.get('additional_info')}\n"
+                    parts.append(f"Additional Info: {config.get('additional_info')}\n")
+            system_message = "".join(parts)
             
             initial_message = TicketMessage(
                 ticket_id=ticket.id,
-                sender_id=current_user.id,
+                sender_id=user_id,
                 sender_type=TicketMessage.TYPE_SYSTEM,
                 message=system_message,
                 is_internal=False
@@ -494,18 +803,16 @@ def submit_support():
             
             db.session.commit()
             
-            # Send ticket to support dashboard - FIXED
-            success = send_ticket_to_support_api(ticket)
-            if not success:
-                logging.warning(f"Failed to send ticket {ticket.ticket_id} to support dashboard")
+            # Send ticket to support dashboard in the background
+            support_executor.submit(send_ticket_in_background, ticket.id)
             
-            logging.info(f"Support ticket created: {ticket.ticket_id} by {current_user.username}")
+            logging.info("Support ticket created: %s by %s", ticket.ticket_id, username)
             flash(f'Support ticket {ticket.ticket_id} created successfully!', 'success')
             return redirect(url_for('view_ticket', ticket_id=ticket.ticket_id))
             
         except Exception as e:
             db.session.rollback()
-            logging.error(f"Error submitting support request: {str(e)}")
+            logging.error("Error submitting support request: %s", e)
             flash("Error submitting support request. Please try again.", "error")
     else:
         # Form validation failed
@@ -730,48 +1037,60 @@ def test_form_creation():
         print(f"Form creation error: {e}")
         return False
 
+# Ticket and owner columns sent to the support dashboard, in payload order
+OUTBOUND_TICKET_COLUMNS = (
+    Ticket.ticket_id, Ticket.user_id, User.username, User.email, Ticket.title,
+    Ticket.description, Ticket.error_code, Ticket.priority, Ticket.status,
+    Ticket.created_at, User.system_config
+)
+
+def send_ticket_in_background(ticket_id):
+    """Re-load a ticket in a fresh app context and send it to the support dashboard"""
+    with app.app_context():
+        # Only the payload columns are needed, so skip loading full ORM objects
+        ticket = db.session.execute(
+            select(*OUTBOUND_TICKET_COLUMNS).join(Ticket.user).where(Ticket.id == ticket_id)
+        ).one_or_none()
+        if ticket and not send_ticket_to_support_api(ticket):
+            logging.warning("Failed to send ticket %s to support dashboard", ticket.ticket_id)
+
 def send_ticket_to_support_api(ticket):
-    """Send ticket to support dashboard API - FIXED"""
+    """Send a row of OUTBOUND_TICKET_COLUMNS to support dashboard API - FIXED"""
+    if not support_api_breaker.allow():
+        logging.warning("Support dashboard unavailable, skipping ticket %s", ticket.ticket_id)
+        return False
+    
     try:
-        support_api_url = 'http://localhost:8001/api/tickets'  # Direct URL to ensure it works
-        print(f"DEBUG: Using API URL: {support_api_url}")  # Debug print to verify correct URL
+        support_api_url = f"{selected_config.SUPPORT_API_URL}/tickets"
         
-        ticket_data = {
-            'ticket_id': ticket.ticket_id,
-            'user_id': ticket.user_id,
-            'username': ticket.user.username,
-            'email': ticket.user.email,
-            'title': ticket.title,
-            'description': ticket.description,
-            'error_code': ticket.error_code,
-            'priority': ticket.priority,
-            'status': ticket.status,
-            'created_at': ticket.created_at.isoformat(),
-            'system_config': ticket.user.get_system_config_dict()
-        }
+        ticket_data = dict(ticket._mapping)
+        ticket_data['system_config'] = ticket.system_config or {}
         
-        logging.info(f"Sending ticket to support API: {support_api_url}")
-        logging.info(f"Ticket data: {ticket_data}")
+        logging.info("Sending ticket to support API: %s", support_api_url)
+        logging.info("Ticket data: %s", ticket_data)
         
-        response = requests.post(
+        response = SUPPORT_HTTP.post(
             support_api_url,
-            json=ticket_data,
-            timeout=10,
-            headers={'Content-Type': 'application/json'}
+            data=encode_support_payload(ticket_data),
+            timeout=(3, 10)
         )
         
         if response.status_code == 201:
-            logging.info(f"Ticket {ticket.ticket_id} sent to support dashboard successfully")
+            support_api_breaker.record_success()
+            logging.info("Ticket %s sent to support dashboard successfully", ticket.ticket_id)
             return True
         else:
-            logging.error(f"Failed to send ticket to support dashboard: {response.status_code} - {response.text}")
+            if response.status_code >= 500:
+                support_api_breaker.record_failure()
+            logging.error("Failed to send ticket to support dashboard: %s - %s", response.status_code, response.text)
             return False
             
     except requests.exceptions.RequestException as e:
-        logging.error(f"Network error sending ticket to support API: {str(e)}")
+        support_api_breaker.record_failure()
+        logging.error("Network error sending ticket to support API: %s", e)
         return False
     except Exception as e:
-        logging.error(f"Error sending ticket to support API: {str(e)}")
+        logging.error("Error sending ticket to support API: %s", e)
         return False
 # def send_ticket_to_support_api(ticket):
 #     """Send ticket to support dashboard API"""
@@ -811,7 +1130,7 @@ def send_ticket_to_support_api(ticket):
 @login_required
 def my_tickets():
     """View user's tickets"""
-    page = request.args.get('page', 1, type=int)
+    per_page = 10
     status_filter = request.args.get('status', '')
     
     query = Ticket.query.filter_by(user_id=current_user.id)
@@ -819,11 +1138,36 @@ def my_tickets():
     if status_filter:
         query = query.filter_by(status=status_filter)
     
-    tickets = query.order_by(Ticket.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
-    )
+    total_tickets = query.count()
     
-    return render_template('support/my_tickets.html', tickets=tickets, status_filter=status_filter)
+    # Keyset pagination: continue after the last ticket of the previous page,
+    # so older pages don't have to skip over every newer row
+    after_created_at = request.args.get('after_created_at', '')
+    after_id = request.args.get('after_id', type=int)
+    if after_created_at and after_id:
+        try:
+            cursor = (datetime.fromisoformat(after_created_at), after_id)
+            query = query.filter(tuple_(Ticket.created_at, Ticket.id) < cursor)
+        except ValueError:
+            after_id = None
+    
+    # The list shows a message count per ticket, so load the messages for
+    # the whole page in one extra query instead of one per ticket
+    rows = query.options(selectinload(Ticket.messages))\
+                .order_by(Ticket.created_at.desc(), Ticket.id.desc())\
+                .limit(per_page + 1).all()
+    tickets = rows[:per_page]
+    
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = {'after_created_at': tickets[-1].created_at.isoformat(), 'after_id': tickets[-1].id}
+    
+    return render_template('support/my_tickets.html',
+                         tickets=tickets,
+                         total_tickets=total_tickets,
+                         next_cursor=next_cursor,
+                         is_first_page=not after_id,
+                         status_filter=status_filter)
 
 @app.route('/ticket/<ticket_id>')
 @login_required
@@ -834,7 +1178,10 @@ def view_ticket(ticket_id):
         user_id=current_user.id
     ).first_or_404()
     
-    messages = TicketMessage.query.filter_by(ticket_id=ticket.id)\
+    # Messages are rendered from their own columns only; make any lazy
+    # relationship load from the template fail loudly instead of adding a query per message
+    messages = TicketMessage.query.options(raiseload('*'))\
+                                 .filter_by(ticket_id=ticket.id)\
                                  .filter_by(is_internal=False)\
                                  .order_by(TicketMessage.created_at).all()
     
@@ -875,8 +1222,8 @@ def add_ticket_message(ticket_id):
             db.session.add(message)
             db.session.commit()
             
-            # Notify support dashboard
-            notify_support_of_update(ticket)
+            # Notify support dashboard in the background
+            support_executor.submit(notify_update_in_background, ticket.id)
             
             flash('Your message has been added to the ticket.', 'success')
             
@@ -887,25 +1234,32 @@ def add_ticket_message(ticket_id):
     
     return redirect(url_for('view_ticket', ticket_id=ticket_id))
 
+def notify_update_in_background(ticket_id):
+    """Re-load a ticket in a fresh app context and notify the support dashboard"""
+    with app.app_context():
+        ticket = db.session.get(Ticket, ticket_id)
+        if ticket:
+            notify_support_of_update(ticket)
+
 def notify_support_of_update(ticket):
     """Notify support dashboard of ticket update"""
     try:
-        support_api_url = os.getenv('SUPPORT_API_URL', 'http://localhost:5001/api/tickets')
+        support_api_url = f"{selected_config.SUPPORT_API_URL}/tickets"
         
-        response = requests.put(
+        response = SUPPORT_HTTP.put(
             f"{support_api_url}/{ticket.ticket_id}/user_update",
-            json={
-                'updated_at': datetime.utcnow().isoformat(),
+            data=encode_support_payload({
+                'updated_at': datetime.now(timezone.utc),
                 'status': ticket.status
-            },
+            }),
             timeout=5
         )
         
         if response.status_code == 200:
-            logging.info(f"Support dashboard notified of ticket {ticket.ticket_id} update")
+            logging.info("Support dashboard notified of ticket %s update", ticket.ticket_id)
         
     except Exception as e:
-        logging.error(f"Error notifying support of update: {str(e)}")
+        logging.error("Error notifying support of update: %s", e)
 
 # Chatbot Routes
 @app.route('/chatbot')
@@ -915,25 +1269,19 @@ def chatbot():
     error_code = request.args.get('error_code', '')
     solution_id = request.args.get('solution_id', '')
     
-    # Create new conversation
-    conversation_id = str(uuid.uuid4())
-    try:
-        conversation = Conversation(
-            conversation_id=conversation_id,
-            user_id=current_user.id,
-            error_code=error_code
-        )
-        db.session.add(conversation)
-        db.session.commit()
-        
-    except Exception as e:
-        logging.error(f"Error creating conversation: {str(e)}")
-        db.session.rollback()
+    # The conversation row is created when the first message is sent
+    conversation_id = secrets.token_hex(16)
     
     return render_template('chatbot/chatbot.html', 
                          conversation_id=conversation_id,
                          error_code=error_code)
 
+AI_UNAVAILABLE_RESPONSE = {
+    'content': "I apologize, but the AI assistant is currently unavailable. Please contact support for assistance with your issue.",
+    'escalate': True,
+    'escalation_reason': 'ai_unavailable'
+}
+
 @app.route('/chat', methods=['POST'])
 @login_required
 def chat():
@@ -946,30 +1294,14 @@ def chat():
         if not conversation_id or not user_message:
             return jsonify({"error": "Missing required data"}), 400
         
-        # Get conversation from database
-        conversation = Conversation.query.filter_by(
-            conversation_id=conversation_id,
-            user_id=current_user.id
-        ).first()
-        
+        conversation = get_or_create_conversation(conversation_id, data.get('error_code', ''))
         if not conversation:
             return jsonify({"error": "Conversation not found"}), 404
         
-        # Add user message to database
-        user_msg = ConversationMessage(
-            conversation_id=conversation.id,
-            role='user',
-            content=user_message
-        )
-        db.session.add(user_msg)
-        
-        # Get conversation history
-        messages = ConversationMessage.query.filter_by(conversation_id=conversation.id)\
-                                          .order_by(ConversationMessage.created_at).all()
-        
-        message_history = [{'role': msg.role, 'content': msg.content} for msg in messages]
+        message_history = load_chat_history(conversation, user_message)
         
         # Get AI response
+        gemini_assistant = get_gemini_assistant()
         if gemini_assistant and gemini_assistant.initialized:
             ai_response = gemini_assistant.get_response(
                 user_message, 
@@ -977,39 +1309,122 @@ def chat():
                 message_history
             )
         else:
-            ai_response = {
-                'content': "I apologize, but the AI assistant is currently unavailable. Please contact support for assistance with your issue.",
-                'escalate': True,
-                'escalation_reason': 'ai_unavailable'
-            }
-        
-        # Add AI response to database
-        ai_msg = ConversationMessage(
-            conversation_id=conversation.id,
-            role='assistant',
-            content=ai_response['content']
-        )
-        db.session.add(ai_msg)
+            ai_response = AI_UNAVAILABLE_RESPONSE
         
-        # Update conversation status if escalated
-        if ai_response.get('escalate', False):
-            conversation.status = 'escalated'
-            conversation.escalated = True
-            conversation.escalation_reason = ai_response.get('escalation_reason', 'user_request')
-        
-        db.session.commit()
+        reply = chat_reply(ai_response)
+        save_chat_exchange(conversation, user_message, reply)
         
-        return jsonify({
-            "response": ai_response['content'],
-            "escalate": ai_response.get('escalate', False),
-            "escalation_reason": ai_response.get('escalation_reason', '')
-        })
+        return jsonify(reply)
         
     except Exception as e:
         db.session.rollback()
         logging.error(f"Error in chat: {str(e)}")
         return jsonify({"error": f"Chat error occurred: {str(e)}"}), 500
 
+@app.route('/chat/stream', methods=['POST'])
+@login_required
+def chat_stream():
+    """Handle chat messages with Gemini AI, streaming the reply as server-sent events"""
+    data = request.get_json(silent=True) or {}
+    conversation_id = data.get('conversation_id')
+    user_message = data.get('message')
+    
+    if not conversation_id or not user_message:
+        return jsonify({"error": "Missing required data"}), 400
+    
+    conversation = get_or_create_conversation(conversation_id, data.get('error_code', ''))
+    if not conversation:
+        return jsonify({"error": "Conversation not found"}), 404
+    
+    message_history = load_chat_history(conversation, user_message)
+    
+    return Response(stream_with_context(stream_chat_reply(conversation, user_message, message_history)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def stream_chat_reply(conversation, user_message, message_history):
+    """Yield SSE events for each reply chunk, saving the exchange once the reply is complete"""
+    def event(payload):
+        return f"data: {app.json.dumps(payload)}\n\n"
+    
+    gemini_assistant = get_gemini_assistant()
+    if gemini_assistant and gemini_assistant.initialized:
+        chunks = []
+        try:
+            for chunk in gemini_assistant.stream_response(user_message, conversation.error_code or '', message_history):
+                chunks.append(chunk)
+                yield event({"delta": chunk})
+            ai_response = gemini_assistant.parse_response("".join(chunks))
+        except Exception as e:
+            logging.error(f"Error streaming AI response: {str(e)}")
+            ai_response = {
+                'content': "I'm having trouble processing your request right now. Let me connect you with human support.",
+                'escalate': True,
+                'escalation_reason': 'ai_error'
+            }
+    else:
+        ai_response = AI_UNAVAILABLE_RESPONSE
+    
+    reply = chat_reply(ai_response)
+    try:
+        save_chat_exchange(conversation, user_message, reply)
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error saving chat exchange: {str(e)}")
+    
+    yield event({"done": True, **reply})
+
+def chat_reply(ai_response):
+    """Build the chat reply body, reading each response field once"""
+    return {
+        "response": ai_response['content'],
+        "escalate": ai_response.get('escalate', False),
+        "escalation_reason": ai_response.get('escalation_reason', '')
+    }
+
+def get_or_create_conversation(conversation_id, error_code):
+    """Find the user's conversation, creating it when its first message arrives"""
+    conversation = Conversation.query.filter_by(conversation_id=conversation_id).first()
+    if conversation is None:
+        conversation = Conversation(
+            conversation_id=conversation_id,
+            user_id=current_user.id,
+            error_code=error_code
+        )
+        db.session.add(conversation)
+        # Assign the id now; it is committed together with the first messages
+        db.session.flush()
+    elif conversation.user_id != current_user.id:
+        return None
+    return conversation
+
+def load_chat_history(conversation, user_message):
+    """Return the most recent conversation history, oldest first, ending with the new message"""
+    messages = ConversationMessage.query.filter_by(conversation_id=conversation.id)\
+                                      .order_by(ConversationMessage.created_at.desc(), ConversationMessage.id.desc())\
+                                      .limit(app.config['MAX_MESSAGE_HISTORY']).all()
+    
+    message_history = [{'role': msg.role, 'content': msg.content} for msg in reversed(messages)]
+    message_history.append({'role': 'user', 'content': user_message})
+    return message_history
+
+def save_chat_exchange(conversation, user_message, reply):
+    """Save both sides of a chat exchange and any escalation in one commit"""
+    # Insert both messages with a single executemany
+    now = datetime.utcnow()
+    db.session.execute(insert(ConversationMessage), [
+        {'conversation_id': conversation.id, 'role': 'user', 'content': user_message, 'created_at': now},
+        {'conversation_id': conversation.id, 'role': 'assistant', 'content': reply['response'], 'created_at': now}
+    ])
+    
+    # Update conversation status if escalated
+    if reply['escalate']:
+        conversation.status = 'escalated'
+        conversation.escalated = True
+        conversation.escalation_reason = reply['escalation_reason'] or 'user_request'
+    
+    db.session.commit()
+
 # Feedback and API Routes
 @app.route('/api/feedback', methods=['POST'])
 @login_required
@@ -1032,12 +1447,10 @@ def feedback():
         db.session.add(feedback_record)
         
         # Update knowledge base solution stats
-        kb_solution = KnowledgeBaseSolution.query.filter_by(error_code=error_code).first()
-        if kb_solution:
-            if feedback_type == 'solved':
-                kb_solution.success_count += 1
-            elif feedback_type == 'failed':
-                kb_solution.failure_count += 1
+        if feedback_type == 'solved':
+            KnowledgeBaseSolution.bump_success(error_code)
+        elif feedback_type == 'failed':
+            KnowledgeBaseSolution.bump_failure(error_code)
         
         db.session.commit()
         
@@ -1049,20 +1462,25 @@ def feedback():
         logging.error(f"Error recording feedback: {str(e)}")
         return jsonify({"status": "error", "message": "Failed to record feedback"}), 500
 
-@app.route('/health')
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
+@functools.cache
+def health_components():
+    """Component status, computed once; reload_knowledge_base clears it"""
+    gemini_assistant = get_gemini_assistant()
+    return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
         "components": {
             "database": db.engine.url.database is not None,
-            "file_scanner": file_scanner is not None,
-            "dump_analyzer": dump_analyzer is not None,
-            "knowledge_base": knowledge_base is not None,
+            "file_scanner": get_file_scanner() is not None,
+            "dump_analyzer": get_dump_analyzer() is not None,
+            "knowledge_base": get_knowledge_base() is not None,
             "gemini_assistant": gemini_assistant is not None and getattr(gemini_assistant, 'initialized', False)
         }
-    })
+    }
+
+@app.route('/health')
+def health_check():
+    """Health check endpoint"""
+    return jsonify({**health_components(), "timestamp": datetime.now().isoformat()})
 
 # Error Handlers
 @app.errorhandler(404)
@@ -1103,9 +1521,10 @@ if __name__ == '__main__':
     print(f"Debug mode: {app.config['DEBUG']}")
     print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
     print(f"Components status:")
-    print(f"  - File Scanner: {'✓' if file_scanner else '✗'}")
-    print(f"  - Dump Analyzer: {'✓' if dump_analyzer else '✗'}")
-    print(f"  - Knowledge Base: {'✓' if knowledge_base else '✗'}")
+    gemini_assistant = get_gemini_assistant()
+    print(f"  - File Scanner: {'✓' if get_file_scanner() else '✗'}")
+    print(f"  - Dump Analyzer: {'✓' if get_dump_analyzer() else '✗'}")
+    print(f"  - Knowledge Base: {'✓' if get_knowledge_base() else '✗'}")
     print(f"  - Gemini AI: {'✓' if gemini_assistant and getattr(gemini_assistant, 'initialized', False) else '✗'}")
     print("=" * 60)
     print("Flask server will start on: http://127.0.0.1:8000")
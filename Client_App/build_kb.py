@@ -0,0 +1,36 @@
+# build_kb.py - Knowledge Base Build Script
+"""
+Build script for Windows Dump Analyzer
+Compiles knowledge_base/errors.json into utils/_kb_data.py so workers import
+the knowledge base as bytecode instead of parsing JSON at startup.
+Re-run this script whenever the JSON file changes; a stale module is ignored.
+"""
+
+import hashlib
+import json
+import os
+import pprint
+import sys
+
+# Add the current directory to Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils', '_kb_data.py')
+
+def build_kb_module(source=Config.KNOWLEDGE_BASE_PATH, target=OUTPUT_PATH):
+    """Write the knowledge base as Python literals tagged with the source digest"""
+    with open(source, 'rb') as f:
+        raw = f.read()
+    errors_db = json.loads(raw)
+    
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write(f"# Generated by build_kb.py from {source} - do not edit\n")
+        f.write(f"SOURCE_SHA256 = {hashlib.sha256(raw).hexdigest()!r}\n\n")
+        f.write(f"ERRORS_DB = {pprint.pformat(errors_db, width=100, sort_dicts=False)}\n")
+    
+    print(f"Compiled {len(errors_db.get('errors', []))} errors into {target}")
+
+if __name__ == '__main__':
+    build_kb_module(*sys.argv[1:3])
@@ -13,9 +13,18 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_RECORD_QUERIES = True
     SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 20,
+        'pool_timeout': 30,
         'pool_pre_ping': True,
         'pool_recycle': 300,
     }
+    # Merged over the above for SQLite URLs: keep connections (and their page
+    # cache) alive for longer and wait on a locked database instead of failing
+    SQLITE_ENGINE_OPTIONS = {
+        'pool_recycle': 3600,
+        'connect_args': {'check_same_thread': False, 'timeout': 30}
+    }
     
     # Authentication Settings
     REMEMBER_COOKIE_DURATION = timedelta(days=30)
@@ -37,9 +46,11 @@ class Config:
     
     # WinDbg settings
     WINDBG_PATH = os.environ.get('WINDBG_PATH') or r'C:\Program Files (x86)\Windows Kits\10\Debuggers\x64\windbg.exe'
+    WINDBG_BATCH_SIZE = 16  # dumps opened per debugger process
     
     # Knowledge base settings
     KNOWLEDGE_BASE_PATH = 'knowledge_base/errors.json'
+    KNOWLEDGE_BASE_JOURNAL_PATH = 'knowledge_base/errors.jsonl'  # add_error appends here
     
     # Email settings for notifications
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
@@ -50,7 +61,7 @@ class Config:
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@dumpanalyzer.com'
     
     # Support Dashboard Integration
-    SUPPORT_API_URL = os.environ.get('SUPPORT_API_URL') or 'http://localhost:5001/api'
+    SUPPORT_API_URL = os.environ.get('SUPPORT_API_URL') or 'http://localhost:8001/api'
     SUPPORT_API_KEY = os.environ.get('SUPPORT_API_KEY') or 'dev-support-api-key'
     
     # Gemini AI settings
@@ -58,6 +69,8 @@ class Config:
     GEMINI_MODEL = 'gemini-2.0-flash'
     GEMINI_TEMPERATURE = 0.7
     GEMINI_MAX_TOKENS = 1024
+    GEMINI_TIMEOUT_MS = 30000  # per-request HTTP timeout for the Gemini client
+    GEMINI_MAX_CONTEXT_TOKENS = 2000  # budget for conversation history in the prompt
     
     # Chatbot settings
     CONVERSATION_TIMEOUT = 3600  # 1 hour
@@ -65,6 +78,8 @@ class Config:
     
     # Performance settings
     MAX_DUMP_SIZE = 100 * 1024 * 1024  # 100MB
+    ANALYSIS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'analysis_cache')
+    ANALYSIS_CACHE_THRESHOLD = 2000  # cached dump analyses kept on disk
     SCAN_TIMEOUT = 30  # seconds
     
     # Pagination settings
@@ -116,6 +131,9 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     
+    # In-memory SQLite shares one StaticPool connection, so no pool sizing
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    
     # Disable external services for testing
     MAIL_SUPPRESS_SEND = True
 
@@ -132,6 +150,14 @@ class ProductionConfig(Config):
             uri = uri.replace("postgres://", "postgresql://", 1)
         return uri
     
+    # Larger pool for multiple workers; no per-query debug records
+    SQLALCHEMY_RECORD_QUERIES = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        **Config.SQLALCHEMY_ENGINE_OPTIONS,
+        'pool_size': 20,
+        'max_overflow': 40,
+    }
+    
     # Enhanced security for production
     PREFERRED_URL_SCHEME = 'https'
     
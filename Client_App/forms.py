@@ -1,4 +1,5 @@
 # forms.py - Clean WTForms without placeholder issues
+import sys
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, PasswordField, SelectField, BooleanField, SubmitField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, ValidationError, Optional
@@ -10,26 +11,67 @@ except ImportError:
     # Handle case where models aren't loaded yet
     User = None
 
-class RegistrationForm(FlaskForm):
+# Shared by the registration and profile forms
+STORAGE_CHOICES = (
+    ('ssd', 'SSD'),
+    ('hdd', 'HDD'),
+    ('nvme', 'NVMe SSD'),
+    ('hybrid', 'Hybrid (SSD + HDD)')
+)
+
+# Interned keys (plus coerce=sys.intern on the field) let choice validation
+# match submitted values by identity
+PRIORITY_CHOICES = tuple((sys.intern(key), label) for key, label in (
+    ('low', 'Low - General questions, feature requests'),
+    ('medium', 'Medium - System issues affecting functionality'),
+    ('high', 'High - Critical system problems, frequent crashes'),
+    ('critical', 'Critical - System completely unusable')
+))
+
+FEEDBACK_CHOICES = (
+    ('solved', 'Yes, it solved my problem completely'),
+    ('partial', 'It helped partially, but I still have issues'),
+    ('failed', 'No, it didn\'t help at all')
+)
+
+USERNAME_VALIDATORS = (
+    DataRequired(message='Username is required'),
+    Length(min=3, max=20, message='Username must be between 3 and 20 characters')
+)
+
+EMAIL_VALIDATORS = (
+    DataRequired(message='Email is required'),
+    Email(message='Please enter a valid email address')
+)
+
+def _password_and_confirm(form, field):
+    """Check password length and confirmation in one validator"""
+    password = form.password.data
+    if not password:
+        return  # already reported by the password field's DataRequired
+    if len(password) < 6:
+        raise ValidationError('Password must be at least 6 characters long')
+    if password != field.data:
+        raise ValidationError('Passwords must match')
+
+class _FastForm(FlaskForm):
+    """Base form that declares the shared Meta options once"""
+    class Meta:
+        csrf = True
+
+class RegistrationForm(_FastForm):
     """User registration form"""
-    username = StringField('Username', validators=[
-        DataRequired(message='Username is required'),
-        Length(min=3, max=20, message='Username must be between 3 and 20 characters')
-    ])
+    username = StringField('Username', validators=USERNAME_VALIDATORS)
     
-    email = StringField('Email', validators=[
-        DataRequired(message='Email is required'),
-        Email(message='Please enter a valid email address')
-    ])
+    email = StringField('Email', validators=EMAIL_VALIDATORS)
     
     password = PasswordField('Password', validators=[
-        DataRequired(message='Password is required'),
-        Length(min=6, message='Password must be at least 6 characters long')
+        DataRequired(message='Password is required')
     ])
     
     password_confirm = PasswordField('Confirm Password', validators=[
         DataRequired(message='Please confirm your password'),
-        EqualTo('password', message='Passwords must match')
+        _password_and_confirm
     ])
     
     # System Configuration Fields
@@ -45,12 +87,7 @@ class RegistrationForm(FlaskForm):
         DataRequired(message='RAM size is required')
     ])
     
-    storage_type = SelectField('Primary Storage', choices=[
-        ('ssd', 'SSD'),
-        ('hdd', 'HDD'),
-        ('nvme', 'NVMe SSD'),
-        ('hybrid', 'Hybrid (SSD + HDD)')
-    ], validators=[DataRequired()])
+    storage_type = SelectField('Primary Storage', choices=STORAGE_CHOICES, validators=[DataRequired()])
     
     graphics_card = StringField('Graphics Card', validators=[Optional()])
     
@@ -58,21 +95,14 @@ class RegistrationForm(FlaskForm):
     
     additional_info = TextAreaField('Additional System Information', validators=[Optional()])
     
+    # Uniqueness of username/email is enforced by the database on insert;
+    # the register view turns an IntegrityError into a field error
     def validate_username(self, username):
-        """Check if username already exists"""
-        if User:
-            user = User.query.filter_by(username=username.data).first()
-            if user:
-                raise ValidationError('Username already exists. Please choose a different one.')
-    
-    def validate_email(self, email):
-        """Check if email already exists"""
-        if User:
-            user = User.query.filter_by(email=email.data).first()
-            if user:
-                raise ValidationError('Email already registered. Please use a different email or login.')
+        """Check username format"""
+        if '@' in username.data:
+            raise ValidationError('Username cannot contain the @ character.')
 
-class LoginForm(FlaskForm):
+class LoginForm(_FastForm):
     """User login form"""
     username = StringField('Username or Email', validators=[
         DataRequired(message='Please enter your username or email')
@@ -84,7 +114,7 @@ class LoginForm(FlaskForm):
     
     remember_me = BooleanField('Remember Me')
 
-class SupportTicketForm(FlaskForm):
+class SupportTicketForm(_FastForm):
     """Support ticket creation form"""
     title = StringField('Issue Title', validators=[
         DataRequired(message='Please provide a title for your issue'),
@@ -98,43 +128,26 @@ class SupportTicketForm(FlaskForm):
     
     error_code = StringField('Error Code (if any)', validators=[Optional()])
     
-    priority = SelectField('Priority Level', choices=[
-        ('low', 'Low - General questions, feature requests'),
-        ('medium', 'Medium - System issues affecting functionality'),
-        ('high', 'High - Critical system problems, frequent crashes'),
-        ('critical', 'Critical - System completely unusable')
-    ], default='medium', validators=[DataRequired()])
+    priority = SelectField('Priority Level', choices=PRIORITY_CHOICES, default='medium',
+                           coerce=sys.intern, validators=[DataRequired()])
     
     steps_tried = TextAreaField('Steps Already Tried', validators=[Optional()])
     
     attach_conversation = BooleanField('Include AI conversation history', default=True)
     email_updates = BooleanField('Send me email updates', default=True)
     submit = SubmitField('Submit Request')
-    class Meta:
-        csrf = True
 
-class UserProfileForm(FlaskForm):
+class UserProfileForm(_FastForm):
     """User profile update form"""
-    username = StringField('Username', validators=[
-        DataRequired(message='Username is required'),
-        Length(min=3, max=20, message='Username must be between 3 and 20 characters')
-    ])
+    username = StringField('Username', validators=USERNAME_VALIDATORS)
     
-    email = StringField('Email', validators=[
-        DataRequired(message='Email is required'),
-        Email(message='Please enter a valid email address')
-    ])
+    email = StringField('Email', validators=EMAIL_VALIDATORS)
     
     # System Configuration Fields
     os_version = StringField('Operating System', validators=[DataRequired()])
     processor = StringField('Processor', validators=[DataRequired()])
     ram_size = StringField('RAM', validators=[DataRequired()])
-    storage_type = SelectField('Primary Storage', choices=[
-        ('ssd', 'SSD'),
-        ('hdd', 'HDD'),
-        ('nvme', 'NVMe SSD'),
-        ('hybrid', 'Hybrid (SSD + HDD)')
-    ], validators=[DataRequired()])
+    storage_type = SelectField('Primary Storage', choices=STORAGE_CHOICES, validators=[DataRequired()])
     
     graphics_card = StringField('Graphics Card', validators=[Optional()])
     motherboard = StringField('Motherboard', validators=[Optional()])
@@ -146,20 +159,11 @@ class UserProfileForm(FlaskForm):
         self.original_email = original_email
     
     def validate_username(self, username):
-        """Check if username already exists (excluding current user)"""
-        if User and username.data != self.original_username:
-            user = User.query.filter_by(username=username.data).first()
-            if user:
-                raise ValidationError('Username already exists. Please choose a different one.')
-    
-    def validate_email(self, email):
-        """Check if email already exists (excluding current user)"""
-        if User and email.data != self.original_email:
-            user = User.query.filter_by(email=email.data).first()
-            if user:
-                raise ValidationError('Email already registered. Please use a different email.')
+        """Check username format (uniqueness is enforced on commit)"""
+        if '@' in username.data:
+            raise ValidationError('Username cannot contain the @ character.')
 
-class ChangePasswordForm(FlaskForm):
+class ChangePasswordForm(_FastForm):
     """Change password form"""
     current_password = PasswordField('Current Password', validators=[
         DataRequired(message='Please enter your current password')
@@ -175,19 +179,15 @@ class ChangePasswordForm(FlaskForm):
         EqualTo('new_password', message='Passwords must match')
     ])
 
-class TicketMessageForm(FlaskForm):
+class TicketMessageForm(_FastForm):
     """Form for adding messages to existing tickets"""
     message = TextAreaField('Your Message', validators=[
         DataRequired(message='Please enter your message'),
         Length(min=5, max=1000, message='Message must be between 5 and 1000 characters')
     ])
 
-class FeedbackForm(FlaskForm):
+class FeedbackForm(_FastForm):
     """Form for solution feedback"""
-    feedback_type = SelectField('Did this solution help?', choices=[
-        ('solved', 'Yes, it solved my problem completely'),
-        ('partial', 'It helped partially, but I still have issues'),
-        ('failed', 'No, it didn\'t help at all')
-    ], validators=[DataRequired()])
+    feedback_type = SelectField('Did this solution help?', choices=FEEDBACK_CHOICES, validators=[DataRequired()])
     
     notes = TextAreaField('Additional Comments', validators=[Optional()])
\ No newline at end of file
@@ -6,8 +6,11 @@ Run this script to set up the database tables and create sample data
 
 import os
 import sys
+import ijson
+import itertools
 from datetime import datetime
 from flask import Flask
+from sqlalchemy import select, func, text
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -18,7 +21,10 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import models and app configuration
 from models import db, User, KnowledgeBaseSolution
-from utils.knowledge_base import create_knowledge_base_file
+from utils.knowledge_base import create_knowledge_base_file, iter_journal
+
+# Rows per executemany when loading the knowledge base
+KB_INSERT_BATCH_SIZE = 500
 
 def create_app():
     """Create Flask app for database initialization"""
@@ -69,41 +75,50 @@ def init_database():
 
 def load_knowledge_base_solutions():
     """Load knowledge base solutions from JSON into database"""
-    import json
-    
     kb_file = 'knowledge_base/errors.json'
     if not os.path.exists(kb_file):
         print(f"Knowledge base file not found: {kb_file}")
         return
     
     try:
-        with open(kb_file, 'r', encoding='utf-8') as f:
-            kb_data = json.load(f)
-        
-        solutions_added = 0
-        for error_data in kb_data.get('errors', []):
-            # Check if solution already exists
-            existing = KnowledgeBaseSolution.query.filter_by(
-                error_code=error_data['error_code']
-            ).first()
-            
-            if not existing:
-                solution = KnowledgeBaseSolution(
-                    error_code=error_data['error_code'],
-                    error_name=error_data['error_name'],
-                    description=error_data['description'],
-                    category=error_data['category'],
-                    confidence=error_data['confidence'],
-                    additional_info=error_data.get('additional_info', ''),
-                    gemini_context=error_data.get('gemini_context', '')
-                )
-                solution.set_solutions(error_data['solutions'])
+        # Load the existing error codes once instead of querying per entry
+        existing = {row[0] for row in db.session.query(KnowledgeBaseSolution.error_code).all()}
+        
+        insert_stmt = KnowledgeBaseSolution.__table__.insert()
+        batch = []
+        loaded = 0
+        
+        # Stream entries one at a time so memory stays bounded by the batch size,
+        # followed by any added since the JSON file was last compacted
+        with open(kb_file, 'rb') as f:
+            entries = itertools.chain(ijson.items(f, 'errors.item', use_float=True),
+                                      iter_journal('knowledge_base/errors.jsonl'))
+            for error_data in entries:
+                if error_data['error_code'] in existing:
+                    continue
+                existing.add(error_data['error_code'])
+                batch.append({
+                    'error_code': error_data['error_code'],
+                    'error_name': error_data['error_name'],
+                    'description': error_data['description'],
+                    'category': error_data['category'],
+                    'confidence': error_data['confidence'],
+                    'solutions': error_data['solutions'],
+                    'additional_info': error_data.get('additional_info', ''),
+                    'gemini_context': error_data.get('gemini_context', '')
+                })
                 
-                db.session.add(solution)
-                solutions_added += 1
+                # One Core executemany per batch instead of an ORM object per row
+                if len(batch) >= KB_INSERT_BATCH_SIZE:
+                    db.session.execute(insert_stmt, batch)
+                    loaded += len(batch)
+                    batch = []
         
+        if batch:
+            db.session.execute(insert_stmt, batch)
+            loaded += len(batch)
         db.session.commit()
-        print(f"Loaded {solutions_added} knowledge base solutions")
+        print(f"Loaded {loaded} knowledge base solutions")
         
     except Exception as e:
         print(f"Error loading knowledge base solutions: {str(e)}")
@@ -159,6 +174,41 @@ def create_sample_users():
         print(f"Error creating sample users: {str(e)}")
         db.session.rollback()
 
+# Columns that moved from JSON-encoded Text to the JSON column type
+JSON_COLUMNS = (
+    ('users', 'system_config'),
+    ('dump_analyses', 'analysis_data'),
+    ('kb_solutions', 'solutions'),
+)
+
+def migrate_json_columns():
+    """Convert the JSON columns of a database created before they used the JSON type"""
+    app = create_app()
+    
+    with app.app_context():
+        try:
+            if db.engine.dialect.name == 'postgresql':
+                for table, column in JSON_COLUMNS:
+                    data_type = db.session.scalar(text(
+                        "SELECT data_type FROM information_schema.columns "
+                        "WHERE table_name = :table AND column_name = :column"
+                    ), {'table': table, 'column': column})
+                    if data_type in ('text', 'character varying'):
+                        db.session.execute(text(
+                            f"ALTER TABLE {table} ALTER COLUMN {column} "
+                            f"TYPE JSONB USING NULLIF({column}, '')::jsonb"
+                        ))
+                        print(f"Converted {table}.{column} to JSONB")
+            else:
+                # SQLite stores JSON as text already; only empty strings don't parse
+                for table, column in JSON_COLUMNS:
+                    db.session.execute(text(f"UPDATE {table} SET {column} = NULL WHERE {column} = ''"))
+            db.session.commit()
+            print("JSON column migration completed!")
+        except Exception as e:
+            print(f"Error migrating JSON columns: {str(e)}")
+            db.session.rollback()
+
 def reset_database():
     """Reset database by dropping and recreating all tables"""
     app = create_app()
@@ -198,8 +248,9 @@ def check_database():
     with app.app_context():
         try:
             # Check if tables exist
-            users_count = User.query.count()
-            kb_solutions_count = KnowledgeBaseSolution.query.count()
+            # Plain COUNT queries; Query.count() wraps the full entity in a subquery
+            users_count = db.session.scalar(select(func.count(User.id)))
+            kb_solutions_count = db.session.scalar(select(func.count(KnowledgeBaseSolution.id)))
             
             print("Database Status:")
             print(f"  - Users: {users_count}")
@@ -223,7 +274,7 @@ if __name__ == '__main__':
     import argparse
     
     parser = argparse.ArgumentParser(description='Database management for Windows Dump Analyzer')
-    parser.add_argument('action', choices=['init', 'reset', 'backup', 'check'], 
+    parser.add_argument('action', choices=['init', 'reset', 'backup', 'check', 'migrate-json'], 
                        help='Action to perform')
     
     args = parser.parse_args()
@@ -238,6 +289,8 @@ if __name__ == '__main__':
             print("Database reset cancelled")
     elif args.action == 'backup':
         backup_database()
+    elif args.action == 'migrate-json':
+        migrate_json_columns()
     elif args.action == 'check':
 
         check_database()
@@ -1,12 +1,19 @@
 # models.py - Database Models for User Authentication and Ticket System
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import JSONB
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-import uuid
+import hmac
+import secrets
 
 db = SQLAlchemy()
 
+# JSON columns are stored as JSONB on Postgres (indexable), JSON text elsewhere
+JSONType = db.JSON().with_variant(JSONB(), 'postgresql')
+
 class User(UserMixin, db.Model):
     """User model for authentication and profile management"""
     __tablename__ = 'users'
@@ -15,37 +22,39 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
-    system_config = db.Column(db.Text, nullable=True)  # JSON string with system specs
+    system_config = db.Column(JSONType, nullable=True)  # System specs, (de)serialized by the column type
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     
-    # Relationships
-    tickets = db.relationship('Ticket', backref='user', lazy=True, cascade='all, delete-orphan')
-    conversations = db.relationship('Conversation', backref='user', lazy=True, cascade='all, delete-orphan')
+    # Relationships (child rows are removed by ON DELETE CASCADE, not loaded and deleted one by one)
+    tickets = db.relationship('Ticket', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    conversations = db.relationship('Conversation', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def set_password(self, password):
         """Hash and set password"""
         self.password_hash = generate_password_hash(password)
     
     def check_password(self, password):
-        """Check if provided password matches hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check if provided password matches hash (memoized for the current request)"""
+        if not has_app_context():
+            return check_password_hash(self.password_hash, password)
+        
+        # Lives on g so results never outlive the request; keyed by an HMAC so the
+        # plaintext itself is never held
+        cache = g.setdefault('_password_checks', {})
+        key = hmac.new(self.password_hash.encode(), password.encode(), 'sha256').digest()
+        if key not in cache:
+            cache[key] = check_password_hash(self.password_hash, password)
+        return cache[key]
     
     def get_system_config_dict(self):
-        """Parse system config JSON string to dict"""
-        if self.system_config:
-            try:
-                import json
-                return json.loads(self.system_config)
-            except:
-                return {}
-        return {}
+        """Get system config as a dict"""
+        return self.system_config or {}
     
     def set_system_config(self, config_dict):
         """Set system config from dict"""
-        import json
-        self.system_config = json.dumps(config_dict)
+        self.system_config = dict(config_dict)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -53,6 +62,10 @@ class User(UserMixin, db.Model):
 class Ticket(db.Model):
     """Support ticket model"""
     __tablename__ = 'tickets'
+    __table_args__ = (
+        # Serves "user's tickets, newest first" without a sort
+        db.Index('ix_ticket_user_created', 'user_id', 'created_at'),
+    )
     
     # Status choices
     STATUS_OPEN = 'open'
@@ -61,15 +74,30 @@ class Ticket(db.Model):
     STATUS_RESOLVED = 'resolved'
     STATUS_CLOSED = 'closed'
     
+    _STATUS_LABELS = {
+        STATUS_OPEN: 'Open',
+        STATUS_IN_PROGRESS: 'In Progress',
+        STATUS_PENDING_USER: 'Pending User Response',
+        STATUS_RESOLVED: 'Resolved',
+        STATUS_CLOSED: 'Closed'
+    }
+    
     # Priority choices
     PRIORITY_LOW = 'low'
     PRIORITY_MEDIUM = 'medium'
     PRIORITY_HIGH = 'high'
     PRIORITY_CRITICAL = 'critical'
     
+    _PRIORITY_LABELS = {
+        PRIORITY_LOW: 'Low',
+        PRIORITY_MEDIUM: 'Medium',
+        PRIORITY_HIGH: 'High',
+        PRIORITY_CRITICAL: 'Critical'
+    }
+    
     id = db.Column(db.Integer, primary_key=True)
     ticket_id = db.Column(db.String(20), unique=True, nullable=False, index=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     
     # Ticket details
     title = db.Column(db.String(200), nullable=False)
@@ -90,7 +118,7 @@ class Ticket(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    messages = db.relationship('TicketMessage', backref='ticket', lazy=True, cascade='all, delete-orphan')
+    messages = db.relationship('TicketMessage', backref='ticket', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def __init__(self, **kwargs):
         super(Ticket, self).__init__(**kwargs)
@@ -100,30 +128,15 @@ class Ticket(db.Model):
     @staticmethod
     def generate_ticket_id():
         """Generate unique ticket ID"""
-        timestamp = datetime.now().strftime('%Y%m%d')
-        unique_id = str(uuid.uuid4())[:8].upper()
-        return f"DUMP-{timestamp}-{unique_id}"
+        return f"DUMP-{datetime.utcnow():%Y%m%d}-{secrets.token_hex(4).upper()}"
     
     def get_status_display(self):
         """Get human-readable status"""
-        status_map = {
-            self.STATUS_OPEN: 'Open',
-            self.STATUS_IN_PROGRESS: 'In Progress',
-            self.STATUS_PENDING_USER: 'Pending User Response',
-            self.STATUS_RESOLVED: 'Resolved',
-            self.STATUS_CLOSED: 'Closed'
-        }
-        return status_map.get(self.status, self.status.title())
+        return self._STATUS_LABELS.get(self.status, self.status.title())
     
     def get_priority_display(self):
         """Get human-readable priority"""
-        priority_map = {
-            self.PRIORITY_LOW: 'Low',
-            self.PRIORITY_MEDIUM: 'Medium',
-            self.PRIORITY_HIGH: 'High',
-            self.PRIORITY_CRITICAL: 'Critical'
-        }
-        return priority_map.get(self.priority, self.priority.title())
+        return self._PRIORITY_LABELS.get(self.priority, self.priority.title())
     
     def can_be_updated_by_user(self):
         """Check if user can still update this ticket"""
@@ -135,6 +148,10 @@ class Ticket(db.Model):
 class TicketMessage(db.Model):
     """Messages within a support ticket"""
     __tablename__ = 'ticket_messages'
+    __table_args__ = (
+        # Serves a ticket's visible messages in order without a sort
+        db.Index('ix_tm_ticket_internal_created', 'ticket_id', 'is_internal', 'created_at'),
+    )
     
     # Message types
     TYPE_USER = 'user'
@@ -142,7 +159,7 @@ class TicketMessage(db.Model):
     TYPE_SYSTEM = 'system'
     
     id = db.Column(db.Integer, primary_key=True)
-    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id', ondelete='CASCADE'), nullable=False)
     sender_id = db.Column(db.Integer, nullable=True)  # User ID or Support Staff ID
     sender_type = db.Column(db.String(20), nullable=False)  # user, support, system
     message = db.Column(db.Text, nullable=False)
@@ -158,7 +175,7 @@ class Conversation(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     conversation_id = db.Column(db.String(50), unique=True, nullable=False, index=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     error_code = db.Column(db.String(20), nullable=True)
     status = db.Column(db.String(20), default='in_progress')
     escalated = db.Column(db.Boolean, default=False)
@@ -167,7 +184,7 @@ class Conversation(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    messages = db.relationship('ConversationMessage', backref='conversation', lazy=True, cascade='all, delete-orphan')
+    messages = db.relationship('ConversationMessage', backref='conversation', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     def __repr__(self):
         return f'<Conversation {self.conversation_id}>'
@@ -175,9 +192,13 @@ class Conversation(db.Model):
 class ConversationMessage(db.Model):
     """Messages within AI conversations"""
     __tablename__ = 'conversation_messages'
+    __table_args__ = (
+        # Serves a conversation's history in order for the chat route
+        db.Index('ix_conv_msg_conv_created', 'conversation_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id', ondelete='CASCADE'), nullable=False)
     role = db.Column(db.String(20), nullable=False)  # user, assistant
     content = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -188,9 +209,13 @@ class ConversationMessage(db.Model):
 class DumpAnalysis(db.Model):
     """Store dump file analysis results"""
     __tablename__ = 'dump_analyses'
+    __table_args__ = (
+        # Serves "user's analyses, newest first" without a sort
+        db.Index('ix_dump_user_created', 'user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     filename = db.Column(db.String(200), nullable=False)
     file_size = db.Column(db.BigInteger, nullable=False)
@@ -201,26 +226,19 @@ class DumpAnalysis(db.Model):
     analyzer_method = db.Column(db.String(50), nullable=True)
     faulting_module = db.Column(db.String(200), nullable=True)
     process_name = db.Column(db.String(200), nullable=True)
-    analysis_data = db.Column(db.Text, nullable=True)  # JSON string with full analysis
+    analysis_data = db.Column(JSONType, nullable=True)  # Full analysis dict
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationship
-    user = db.relationship('User', backref='dump_analyses')
+    user = db.relationship('User', backref=db.backref('dump_analyses', cascade='all, delete-orphan', passive_deletes=True))
     
     def get_analysis_dict(self):
-        """Parse analysis data JSON string to dict"""
-        if self.analysis_data:
-            try:
-                import json
-                return json.loads(self.analysis_data)
-            except:
-                return {}
-        return {}
+        """Get analysis data as a dict"""
+        return self.analysis_data or {}
     
     def set_analysis_data(self, data_dict):
-        """Set analysis data from dict"""
-        import json
-        self.analysis_data = json.dumps(data_dict)
+        """Set analysis data from dict (copied, so later changes to the dict aren't stored)"""
+        self.analysis_data = dict(data_dict)
     
     def __repr__(self):
         return f'<DumpAnalysis {self.filename} for User {self.user_id}>'
@@ -229,6 +247,10 @@ class DumpAnalysis(db.Model):
 class KnowledgeBaseSolution(db.Model):
     """Enhanced knowledge base with user feedback"""
     __tablename__ = 'kb_solutions'
+    __table_args__ = (
+        # Covers error code lookups that only need the name and category
+        db.Index('ix_kb_error_code_include', 'error_code', 'error_name', 'category'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     error_code = db.Column(db.String(20), nullable=False, index=True)
@@ -236,26 +258,39 @@ class KnowledgeBaseSolution(db.Model):
     description = db.Column(db.Text, nullable=False)
     category = db.Column(db.String(50), nullable=False)
     confidence = db.Column(db.String(20), default='medium')
-    solutions = db.Column(db.Text, nullable=False)  # JSON string
+    solutions = db.Column(JSONType, nullable=False)  # List of solution steps
     additional_info = db.Column(db.Text, nullable=True)
     gemini_context = db.Column(db.Text, nullable=True)
     success_count = db.Column(db.Integer, default=0)
     failure_count = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Filled in by the database so bulk loads don't compute a timestamp per row
+    created_at = db.Column(db.DateTime, server_default=func.now())
+    updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=datetime.utcnow)
     
     def get_solutions_list(self):
-        """Parse solutions JSON string to list"""
-        try:
-            import json
-            return json.loads(self.solutions)
-        except:
-            return []
+        """Get solutions as a list"""
+        return self.solutions or []
     
     def set_solutions(self, solutions_list):
         """Set solutions from list"""
-        import json
-        self.solutions = json.dumps(solutions_list)
+        self.solutions = list(solutions_list)
+    
+    @classmethod
+    def bump_success(cls, error_code):
+        """Increment success_count in SQL, without loading the row"""
+        cls._bump(error_code, cls.success_count)
+    
+    @classmethod
+    def bump_failure(cls, error_code):
+        """Increment failure_count in SQL, without loading the row"""
+        cls._bump(error_code, cls.failure_count)
+    
+    @classmethod
+    def _bump(cls, error_code, counter):
+        # Single UPDATE ... SET n = n + 1 so concurrent feedback can't lose increments
+        db.session.execute(
+            update(cls).where(cls.error_code == error_code).values({counter: counter + 1})
+        )
     
     def get_success_rate(self):
         """Calculate success rate percentage"""
@@ -272,14 +307,14 @@ class SolutionFeedback(db.Model):
     __tablename__ = 'solution_feedback'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     error_code = db.Column(db.String(20), nullable=False)
     feedback_type = db.Column(db.String(20), nullable=False)  # solved, partial, failed
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.Text, nullable=True)
     
     # Relationship
-    user = db.relationship('User', backref='solution_feedbacks')
+    user = db.relationship('User', backref=db.backref('solution_feedbacks', cascade='all, delete-orphan', passive_deletes=True))
     
     def __repr__(self):
         return f'<SolutionFeedback {self.feedback_type} for {self.error_code}>'
\ No newline at end of file
@@ -5,6 +5,7 @@ class Chatbot {
         this.conversationId = options.conversationId;
         this.errorCode = options.errorCode;
         this.chatEndpoint = options.chatEndpoint;
+        this.streamEndpoint = options.streamEndpoint;
         this.supportEndpoint = options.supportEndpoint;
         
         this.messageContainer = document.getElementById('chatMessages');
@@ -74,12 +75,18 @@ class Chatbot {
     }
     
     sendToServer(message) {
+        if (this.streamEndpoint && window.fetch && window.ReadableStream) {
+            this.streamFromServer(message);
+            return;
+        }
+        
         $.ajax({
             url: this.chatEndpoint,
             method: 'POST',
             contentType: 'application/json',
             data: JSON.stringify({
                 conversation_id: this.conversationId,
+                error_code: this.errorCode,
                 message: message
             }),
             success: (response) => this.handleServerResponse(response),
@@ -87,14 +94,87 @@ class Chatbot {
         });
     }
     
+    async streamFromServer(message) {
+        let bubble = null;
+        let text = '';
+        
+        try {
+            const res = await fetch(this.streamEndpoint, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({
+                    conversation_id: this.conversationId,
+                    error_code: this.errorCode,
+                    message: message
+                })
+            });
+            if (!res.ok || !res.body) {
+                this.handleServerError({status: res.status}, 'error', res.statusText);
+                return;
+            }
+            
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            
+            while (true) {
+                const {value, done} = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, {stream: true});
+                
+                // Server-sent events are separated by a blank line
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                
+                for (const raw of events) {
+                    if (!raw.startsWith('data: ')) continue;
+                    const data = JSON.parse(raw.slice(6));
+                    
+                    if (data.done) {
+                        if (bubble) {
+                            bubble.element.querySelector('p').innerHTML = this.formatMessage(data.response);
+                            bubble.entry.content = data.response;
+                            this.finishResponse(data);
+                        } else {
+                            this.handleServerResponse(data);
+                        }
+                        return;
+                    }
+                    
+                    text += data.delta;
+                    if (!bubble) {
+                        this.hideTypingIndicator();
+                        bubble = {element: this.addMessageToUI(text, 'assistant')};
+                        bubble.entry = this.messageHistory[this.messageHistory.length - 1];
+                    } else {
+                        bubble.element.querySelector('p').innerHTML = this.formatMessage(text);
+                        bubble.entry.content = text;
+                        this.scrollToBottom();
+                    }
+                }
+            }
+            
+            // Stream ended without a final event
+            this.handleServerError({status: 500}, 'error', 'Incomplete response');
+        } catch (error) {
+            this.handleServerError({status: 0}, 'error', error);
+        }
+    }
+    
     handleServerResponse(response) {
         this.hideTypingIndicator();
-        this.isWaitingForResponse = false;
-        this.sendButton.disabled = false;
         
         // Add AI response to UI
         this.addMessageToUI(response.response, 'assistant');
         
+        this.finishResponse(response);
+    }
+    
+    finishResponse(response) {
+        this.hideTypingIndicator();
+        this.isWaitingForResponse = false;
+        this.sendButton.disabled = false;
+        
         // Handle escalation if needed
         if (response.escalate) {
             setTimeout(() => {
@@ -175,6 +255,8 @@ class Chatbot {
             timestamp: new Date().toISOString(),
             isError: isError
         });
+        
+        return messageDiv;
     }
     
     showTypingIndicator() {
@@ -1,75 +1,213 @@
 # utils/dump_analyzer.py - Fixed with missing datetime import and category detection
 import os
+import mmap
+import queue
 import subprocess
 import re
+import threading
+import time
 import logging
 from datetime import datetime
+from cachelib import FileSystemCache
 from config import Config
 
+# WinDbg !analyze -v fields, compiled once at import
+_RE_BUGCHECK_CODE = re.compile(r'BUGCHECK_CODE:\s+([0-9a-fA-F]+)')
+_RE_BUGCHECK_STR = re.compile(r'BUGCHECK_STR:\s+(.+)')
+_RE_MODULE = re.compile(r'MODULE_NAME:\s+(.+)')
+_RE_PROCESS = re.compile(r'PROCESS_NAME:\s+(.+)')
+
+# Printed after each dump's !analyze output in a batched WinDbg session
+_WINDBG_SENTINEL = '__DUMP_ANALYSIS_END_'
+_RE_WINDBG_SENTINEL = re.compile(re.escape(_WINDBG_SENTINEL) + r'(\d+)')
+
+# Common bug check codes mapping
+_COMMON_BUGCHECKS = {
+    '0000001E': {
+        'name': 'KMODE_EXCEPTION_NOT_HANDLED',
+        'category': 'driver'
+    },
+    '0000007E': {
+        'name': 'SYSTEM_THREAD_EXCEPTION_NOT_HANDLED',
+        'category': 'software'
+    },
+    '00000050': {
+        'name': 'PAGE_FAULT_IN_NONPAGED_AREA',
+        'category': 'hardware'
+    },
+    '0000000A': {
+        'name': 'IRQL_NOT_LESS_OR_EQUAL',
+        'category': 'driver'
+    },
+    '000000EF': {
+        'name': 'CRITICAL_PROCESS_DIED',
+        'category': 'system'
+    }
+}
+
+# Each code as its big- and little-endian DWORD, matched by a single bytes regex
+_BUGCHECK_BY_BYTES = {}
+for _code in _COMMON_BUGCHECKS:
+    _raw = bytes.fromhex(_code)
+    _BUGCHECK_BY_BYTES[_raw] = _code
+    _BUGCHECK_BY_BYTES[_raw[::-1]] = _code
+_RE_BUGCHECK_BYTES = re.compile(b'|'.join(re.escape(raw) for raw in _BUGCHECK_BY_BYTES))
+
+
+def _pump_lines(stream, lines):
+    """Copy a pipe into a queue line by line; None marks EOF"""
+    for line in stream:
+        lines.put(line)
+    lines.put(None)
+
+
 class DumpAnalyzer:
+    __slots__ = ('config', 'cache')
+    
     def __init__(self):
         self.config = Config()
+        # Dump files don't change once written, so results are kept until pruned
+        self.cache = FileSystemCache(self.config.ANALYSIS_CACHE_DIR,
+                                     threshold=self.config.ANALYSIS_CACHE_THRESHOLD,
+                                     default_timeout=0)
         
     def analyze_dump(self, file_info):
         """Analyze dump file and extract error information"""
-        try:
-            file_path = file_info['path']
-            logging.info(f"Analyzing dump file: {file_path}")
-            
-            # Try different analysis methods
-            analysis = self._analyze_with_windbg(file_path)
-            
-            if not analysis:
-                analysis = self._analyze_basic_pattern(file_path)
-            
-            if analysis:
-                # Convert datetime objects in file_info to ISO format strings
-                if 'file_info' in analysis:
-                    if 'modified_time' in analysis['file_info'] and isinstance(analysis['file_info']['modified_time'], datetime):
-                        analysis['file_info']['modified_time'] = analysis['file_info']['modified_time'].isoformat()
-                    if 'created_time' in analysis['file_info'] and isinstance(analysis['file_info']['created_time'], datetime):
-                        analysis['file_info']['created_time'] = analysis['file_info']['created_time'].isoformat()
+        return self.analyze_dumps([file_info])[0]
+    
+    def analyze_dumps(self, file_infos):
+        """Analyze several dump files, sharing debugger sessions for the uncached ones"""
+        results = [None] * len(file_infos)
+        to_analyze = []
+        for i, file_info in enumerate(file_infos):
+            cached = self.cache.get(self._cache_key(file_info))
+            if cached is not None:
+                # The cache holds only the analysis; these fields are per call
+                results[i] = {**cached, 'file_info': file_info, 'analysis_time': datetime.now().isoformat()}
+            else:
+                to_analyze.append(i)
+        
+        if not to_analyze:
+            return results
+        
+        # Try different analysis methods
+        windbg_results = self._analyze_with_windbg([file_infos[i]['path'] for i in to_analyze])
+        
+        for i, analysis in zip(to_analyze, windbg_results):
+            file_info = file_infos[i]
+            try:
+                logging.info("Analyzing dump file: %s", file_info['path'])
+                
+                if not analysis:
+                    analysis = self._analyze_basic_pattern(file_info['path'])
+                
+                if analysis:
+                    analysis['analyzer_method'] = analysis.get('method', 'unknown')
+                    # Only cache WinDbg results; a fallback guess (WinDbg missing,
+                    # timed out or failed) should be retried on the next scan
+                    if analysis['analyzer_method'] == 'windbg':
+                        self.cache.set(self._cache_key(file_info), dict(analysis))
+                    analysis.update({
+                        'file_info': file_info,
+                        'analysis_time': datetime.now().isoformat()
+                    })
+                
+                results[i] = analysis
+                
+            except Exception as e:
+                logging.error("Error analyzing dump file %s: %s", file_info['path'], e)
+        
+        return results
+    
+    def _cache_key(self, file_info):
+        return f"{file_info['path']}:{file_info.get('mtime')}:{file_info.get('size')}"
+    
+    def _analyze_with_windbg(self, file_paths):
+        """Analyze dumps using the WinDbg command line, one debugger process per batch"""
+        results = [None] * len(file_paths)
+        if not os.path.exists(self.config.WINDBG_PATH):
+            logging.warning("WinDbg not found, using alternative analysis")
+            return results
+        
+        batch_size = self.config.WINDBG_BATCH_SIZE
+        for start in range(0, len(file_paths), batch_size):
+            batch = file_paths[start:start + batch_size]
+            results[start:start + len(batch)] = self._run_windbg_batch(batch)
+        return results
+    
+    def _run_windbg_batch(self, file_paths):
+        """Open every dump in one session (one -z per file) and run !analyze on each system.
 
-                analysis.update({
-                    'file_info': file_info,
-                    'analysis_time': datetime.now().isoformat(),
-                    'analyzer_method': analysis.get('method', 'unknown')
-                })
-            
-            return analysis
-            
-        except Exception as e:
-            logging.error(f"Error analyzing dump file {file_info['path']}: {str(e)}")
-            return None
+        Only dumps whose sentinel was printed are parsed; if the session fails or
+        a dump hangs past SCAN_TIMEOUT, the remaining dumps are retried one at a time.
+        """
+        outputs, status = self._run_windbg_session(file_paths)
+        results = [self._parse_windbg_output(outputs[n]) if n in outputs else None
+                   for n in range(len(file_paths))]
+        if status == 'ok' or len(file_paths) == 1:
+            return results
+        
+        missing = [n for n in range(len(file_paths)) if n not in outputs]
+        if status == 'timeout':
+            # The first unfinished dump is the one that hung; it already had its SCAN_TIMEOUT
+            missing = missing[1:]
+        for n in missing:
+            results[n] = self._run_windbg_batch([file_paths[n]])[0]
+        return results
     
-    def _analyze_with_windbg(self, file_path):
-        """Analyze dump using WinDbg command line"""
+    def _run_windbg_session(self, file_paths):
+        """Run one WinDbg session over file_paths; return ({index: output}, status)"""
+        cmd = [self.config.WINDBG_PATH]
+        for file_path in file_paths:
+            cmd += ['-z', file_path]
+        
+        # Each dump is its own system (||N); a sentinel marks the end of its output.
+        # .printf keeps the numbered sentinel out of the echoed command line.
+        commands = ''.join(f'||{n}s; !analyze -v; .printf "{_WINDBG_SENTINEL}%d\\n", 0n{n}; '
+                           for n in range(len(file_paths)))
+        cmd += ['-c', commands + 'q', '-logo', 'nul']
+        
+        outputs = {}
         try:
-            if not os.path.exists(self.config.WINDBG_PATH):
-                logging.warning("WinDbg not found, using alternative analysis")
-                return None
-            
-            cmd = [
-                self.config.WINDBG_PATH,
-                '-z', file_path,
-                '-c', '!analyze -v; q',
-                '-logo', 'nul'
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                return self._parse_windbg_output(result.stdout)
-            else:
-                logging.error(f"WinDbg analysis failed: {result.stderr}")
-                return None
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        except Exception as e:
+            logging.error("Error running WinDbg: %s", e)
+            return outputs, 'failed'
+        
+        # A reader thread lets each dump have its own SCAN_TIMEOUT (pipes can't be selected on Windows)
+        lines = queue.Queue()
+        threading.Thread(target=_pump_lines, args=(proc.stdout, lines), daemon=True).start()
+        
+        current = []
+        deadline = time.monotonic() + self.config.SCAN_TIMEOUT
+        try:
+            while True:
+                try:
+                    line = lines.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    logging.error("WinDbg analysis timed out on %s", file_paths[len(outputs)])
+                    proc.kill()
+                    return outputs, 'timeout'
+                if line is None:
+                    break
                 
-        except subprocess.TimeoutExpired:
-            logging.error("WinDbg analysis timed out")
-            return None
+                match = _RE_WINDBG_SENTINEL.search(line)
+                if not match:
+                    current.append(line)
+                    continue
+                current.append(line[:match.start()])
+                outputs[int(match.group(1))] = ''.join(current)
+                current = [line[match.end():]]
+                deadline = time.monotonic() + self.config.SCAN_TIMEOUT
+            
+            if proc.wait() != 0:
+                logging.error("WinDbg analysis failed: %s", ''.join(current)[-2000:])
+                return outputs, 'failed'
+            return outputs, 'ok'
         except Exception as e:
-            logging.error(f"Error running WinDbg: {str(e)}")
-            return None
+            logging.error("Error running WinDbg: %s", e)
+            proc.kill()
+            return outputs, 'failed'
     
     def _parse_windbg_output(self, output):
         """Parse WinDbg output to extract error information"""
@@ -77,29 +215,29 @@ class DumpAnalyzer:
             analysis = {'method': 'windbg'}
             
             # Extract bug check code
-            bug_check_match = re.search(r'BUGCHECK_CODE:\s+([0-9a-fA-F]+)', output)
+            bug_check_match = _RE_BUGCHECK_CODE.search(output)
             if bug_check_match:
                 analysis['error_code'] = f"0X{bug_check_match.group(1).upper().zfill(8)}"
             
             # Extract bug check string
-            bug_check_str_match = re.search(r'BUGCHECK_STR:\s+(.+)', output)
+            bug_check_str_match = _RE_BUGCHECK_STR.search(output)
             if bug_check_str_match:
                 analysis['error_name'] = bug_check_str_match.group(1).strip()
             
             # Extract faulting module
-            module_match = re.search(r'MODULE_NAME:\s+(.+)', output)
+            module_match = _RE_MODULE.search(output)
             if module_match:
                 analysis['faulting_module'] = module_match.group(1).strip()
             
             # Extract process name
-            process_match = re.search(r'PROCESS_NAME:\s+(.+)', output)
+            process_match = _RE_PROCESS.search(output)
             if process_match:
                 analysis['process_name'] = process_match.group(1).strip()
             
             return analysis if analysis.get('error_code') else None
             
         except Exception as e:
-            logging.error(f"Error parsing WinDbg output: {str(e)}")
+            logging.error("Error parsing WinDbg output: %s", e)
             return None
     
     def _analyze_basic_pattern(self, file_path):
@@ -107,45 +245,27 @@ class DumpAnalyzer:
         try:
             analysis = {'method': 'pattern_matching'}
             
-            # Read first few KB of dump file
-            with open(file_path, 'rb') as f:
-                header_data = f.read(8192)  # Read first 8KB
+            # Scan the first 8KB of the dump through a read-only mapping, so
+            # the header is never copied into a bytes object. One pass over
+            # the raw bytes instead of hex-encoding it and scanning once per code.
+            # The file is opened unbuffered since the mapping, not a BufferedReader, reads it.
+            code = None
+            with open(file_path, 'rb', buffering=0) as f:
+                length = min(8192, os.fstat(f.fileno()).st_size)
+                if length:
+                    with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ) as mapped, \
+                            memoryview(mapped) as header_data:
+                        match = _RE_BUGCHECK_BYTES.search(header_data)
+                        if match:
+                            code = _BUGCHECK_BY_BYTES[bytes(match.group())]
+                        del match  # drop the view reference before the mapping closes
             
-            # Convert to hex string for pattern matching
-            hex_data = header_data.hex().upper()
-            
-            # Common bug check codes mapping
-            common_codes = {
-                '0000001E': {
-                    'name': 'KMODE_EXCEPTION_NOT_HANDLED',
-                    'category': 'driver'
-                },
-                '0000007E': {
-                    'name': 'SYSTEM_THREAD_EXCEPTION_NOT_HANDLED',
-                    'category': 'software'
-                },
-                '00000050': {
-                    'name': 'PAGE_FAULT_IN_NONPAGED_AREA',
-                    'category': 'hardware'
-                },
-                '0000000A': {
-                    'name': 'IRQL_NOT_LESS_OR_EQUAL',
-                    'category': 'driver'
-                },
-                '000000EF': {
-                    'name': 'CRITICAL_PROCESS_DIED',
-                    'category': 'system'
-                }
-            }
-            
-            # Look for patterns in hex data
-            for code, info in common_codes.items():
-                if code in hex_data:
-                    analysis['error_code'] = f"0X{code}"
-                    analysis['error_name'] = info['name']
-                    analysis['category'] = info['category']
-                    analysis['confidence'] = 'medium'
-                    break
+            if code:
+                info = _COMMON_BUGCHECKS[code]
+                analysis['error_code'] = f"0X{code}"
+                analysis['error_name'] = info['name']
+                analysis['category'] = info['category']
+                analysis['confidence'] = 'medium'
             
             # If no specific pattern found, create generic analysis
             if 'error_code' not in analysis:
@@ -157,5 +277,5 @@ class DumpAnalyzer:
             return analysis
             
         except Exception as e:
-            logging.error(f"Error in basic pattern analysis: {str(e)}")
+            logging.error("Error in basic pattern analysis: %s", e)
             return None
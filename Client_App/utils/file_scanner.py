@@ -1,92 +1,83 @@
 # utils/file_scanner.py - File Monitoring and Detection
 import os
-import glob
+import time
 import logging
-from datetime import datetime, timedelta
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
 
 class FileScanner:
+    __slots__ = ('config', 'last_scan_time')
+    
     def __init__(self):
         self.config = Config()
         self.last_scan_time = None
         
     def scan_directories(self):
         """Scan configured directories for dump files"""
-        dump_files = []
+        scan_started = time.time()
         
-        for location in self.config.DUMP_LOCATIONS:
-            if os.path.exists(location):
-                try:
-                    # Find all .dmp files
-                    pattern = os.path.join(location, '*.dmp')
-                    files = glob.glob(pattern)
-                    
-                    for file_path in files:
-                        if self._is_valid_dump_file(file_path):
-                            file_info = self._get_file_info(file_path)
-                            dump_files.append(file_info)
-                            
-                except Exception as e:
-                    logging.error(f"Error scanning {location}: {str(e)}")
-                    continue
+        # Locations can be on slow network or removable drives, so list them concurrently
+        locations = self.config.DUMP_LOCATIONS
+        with ThreadPoolExecutor(max_workers=max(1, len(locations))) as executor:
+            dump_files = [f for found in executor.map(self._scan_location, locations) for f in found]
         
         # Sort by modification time (newest first)
-        dump_files.sort(key=lambda x: x['modified_time'], reverse=True)
+        dump_files.sort(key=itemgetter('mtime'), reverse=True)
         
-        self.last_scan_time = datetime.now()
-        logging.info(f"File scan completed. Found {len(dump_files)} dump files")
+        self.last_scan_time = scan_started
+        logging.info("File scan completed. Found %d dump files", len(dump_files))
         
         return dump_files
     
-    def _is_valid_dump_file(self, file_path):
-        """Validate if file is a proper dump file"""
+    def _scan_location(self, location):
+        """List the valid dump files in one configured directory"""
+        dump_files = []
+        if not os.path.exists(location):
+            return dump_files
+        
         try:
-            # Check file size
-            file_size = os.path.getsize(file_path)
-            if file_size == 0 or file_size > self.config.MAX_DUMP_SIZE:
-                return False
-            
-            # Check file extension
-            if not file_path.lower().endswith('.dmp'):
-                return False
-            
-            # Basic header check (dump files start with specific signatures)
-            with open(file_path, 'rb') as f:
-                header = f.read(8)
-                # Windows dump files typically start with specific patterns
-                if len(header) >= 4:
-                    return True  # Basic validation passed
-            
-            return True
-            
+            # One directory read; DirEntry.stat() is reused for validation and file info
+            with os.scandir(location) as entries:
+                for entry in entries:
+                    if not entry.name.lower().endswith('.dmp'):
+                        continue
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    
+                    st = entry.stat()
+                    if self._is_valid_dump_file(entry.path, st):
+                        dump_files.append(self._get_file_info(entry.path, st))
+                    
         except Exception as e:
-            logging.error(f"Error validating dump file {file_path}: {str(e)}")
-            return False
+            logging.error("Error scanning %s: %s", location, e)
+        
+        return dump_files
     
-    def _get_file_info(self, file_path):
+    def _is_valid_dump_file(self, file_path, st):
+        """Validate if file is a proper dump file"""
+        # Check file size (the caller has already matched the .dmp extension)
+        return 0 < st.st_size <= self.config.MAX_DUMP_SIZE
+    
+    def _get_file_info(self, file_path, st):
         """Get detailed information about dump file"""
-        try:
-            stat = os.stat(file_path)
-            
-            return {
-                'path': file_path,
-                'filename': os.path.basename(file_path),
-                'size': stat.st_size,
-                'size_mb': round(stat.st_size / (1024 * 1024), 2),
-                'modified_time': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                'created_time': datetime.fromtimestamp(stat.st_ctime).isoformat()
-            }
-            
-        except Exception as e:
-            logging.error(f"Error getting file info for {file_path}: {str(e)}")
-            return None
+        return {
+            'path': file_path,
+            'filename': os.path.basename(file_path),
+            'size': st.st_size,
+            'size_mb': round(st.st_size / (1024 * 1024), 2),
+            # Epoch floats; formatted only where they are displayed
+            'mtime': st.st_mtime,
+            'ctime': st.st_ctime
+        }
     
     def get_new_files_since_last_scan(self):
         """Get files modified since last scan"""
-        if not self.last_scan_time:
+        since = self.last_scan_time
+        if since is None:
             return self.scan_directories()
         
         all_files = self.scan_directories()
-        new_files = [f for f in all_files if f['modified_time'] > self.last_scan_time]
+        new_files = [f for f in all_files if f['mtime'] > since]
         
         return new_files
\ No newline at end of file
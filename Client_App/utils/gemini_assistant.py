@@ -13,7 +13,34 @@ except ImportError:
     GENAI_AVAILABLE = False
     logging.error("Google GenAI library not installed. Please run: pip install google-genai")
 
+# Identical on every chat request, so it is sent as the system instruction
+# rather than re-embedded in each prompt; as a stable prefix it is eligible
+# for Gemini's implicit prompt caching
+CHAT_SYSTEM_INSTRUCTION = """You are a Windows technical support chatbot helping users with dump file errors.
+
+Guidelines:
+1. Be helpful and patient
+2. Provide step-by-step instructions when needed
+3. Ask clarifying questions if solution didn't work
+4. Escalate complex issues to human support
+5. Use simple, non-technical language when possible
+6. If you determine human support is needed, end your response with [ESCALATE: reason]
+
+Common escalation reasons:
+- complexity: Issue is too complex for automated assistance
+- solution_failed: Multiple solutions have failed
+- user_request: User explicitly requests human support
+- hardware_issue: Physical hardware problems requiring hands-on assistance
+- system_corruption: Severe system damage requiring advanced recovery
+
+Please respond as a helpful technical support assistant. If the user is having trouble with solution steps, provide detailed guidance. If the solution didn't work, ask clarifying questions and suggest alternatives. If the issue seems too complex or you cannot help further, recommend escalation to human support.
+
+Response format should be conversational and helpful. If escalation is needed, end your response with [ESCALATE: reason].
+"""
+
 class GeminiAssistant:
+    __slots__ = ('config', 'client', 'model', 'initialized', '_chat_config', '_stream_config')
+    
     def __init__(self):
         self.config = Config()
         self.client = None
@@ -22,8 +49,25 @@ class GeminiAssistant:
         
         if GENAI_AVAILABLE:
             try:
+                # Built once per process (get_gemini_assistant is cached), so the
+                # client's pooled keep-alive connections are reused across requests
                 self.client = genai.Client(
-                    api_key=self.config.GEMINI_API_KEY
+                    api_key=self.config.GEMINI_API_KEY,
+                    http_options=types.HttpOptions(timeout=self.config.GEMINI_TIMEOUT_MS)
+                )
+                
+                # Chat configs never change, so build them once
+                self._chat_config = types.GenerateContentConfig(
+                    system_instruction=CHAT_SYSTEM_INSTRUCTION,
+                    temperature=self.config.GEMINI_TEMPERATURE,
+                    max_output_tokens=self.config.GEMINI_MAX_TOKENS,
+                )
+                # Google Search can be useful for technical issues
+                self._stream_config = types.GenerateContentConfig(
+                    system_instruction=CHAT_SYSTEM_INSTRUCTION,
+                    tools=[types.Tool(googleSearch=types.GoogleSearch())],
+                    temperature=self.config.GEMINI_TEMPERATURE,
+                    max_output_tokens=self.config.GEMINI_MAX_TOKENS,
                 )
                 self.initialized = True
                 logging.info("Gemini AI initialized successfully")
@@ -43,67 +87,11 @@ class GeminiAssistant:
                     'escalation_reason': 'ai_unavailable'
                 }
             
-            # Build conversation context
-            context = self._build_context(error_code, conversation_history)
-            
-            # Create the complete prompt
-            full_prompt = f"""
-{context}
-
-User message: {user_message}
-
-Please respond as a helpful technical support assistant. If the user is having trouble with solution steps, provide detailed guidance. If the solution didn't work, ask clarifying questions and suggest alternatives. If the issue seems too complex or you cannot help further, recommend escalation to human support.
-
-Response format should be conversational and helpful. If escalation is needed, end your response with [ESCALATE: reason].
-"""
-            
-            # Prepare contents for the API
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=full_prompt),
-                    ],
-                ),
-            ]
-            
-            # Optional: Add tools if needed (Google Search can be useful for technical issues)
-            tools = [
-                types.Tool(googleSearch=types.GoogleSearch()),
-            ]
-            
-            # Generate content configuration
-            generate_content_config = types.GenerateContentConfig(
-                tools=tools,
-                temperature=self.config.GEMINI_TEMPERATURE,
-                max_output_tokens=self.config.GEMINI_MAX_TOKENS,
-            )
-            
-            # Generate response
-            response_text = ""
-            for chunk in self.client.models.generate_content_stream(
-                model=self.model,
-                contents=contents,
-                config=generate_content_config,
-            ):
-                if chunk.text:
-                    response_text += chunk.text
-            
-            # Check if escalation is needed
-            escalate = False
-            escalation_reason = ''
-            if '[ESCALATE:' in response_text:
-                escalate = True
-                escalation_reason = self._extract_escalation_reason(response_text)
-                response_text = response_text.split('[ESCALATE:')[0].strip()
+            response_text = "".join(self.stream_response(user_message, error_code, conversation_history))
             
             logging.info(f"AI response generated for error {error_code}")
             
-            return {
-                'content': response_text,
-                'escalate': escalate,
-                'escalation_reason': escalation_reason
-            }
+            return self.parse_response(response_text)
             
         except Exception as e:
             logging.error(f"Error getting AI response: {str(e)}")
@@ -113,6 +101,36 @@ Response format should be conversational and helpful. If escalation is needed, e
                 'escalation_reason': 'ai_error'
             }
     
+    def stream_response(self, user_message, error_code, conversation_history):
+        """Yield response text chunks from Gemini as they are generated"""
+        contents = self._build_contents(user_message, error_code, conversation_history)
+        
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=self._stream_config,
+        ):
+            if chunk.text:
+                yield chunk.text
+    
+    def parse_response(self, response_text):
+        """Split the escalation marker off a complete response"""
+        # One pass: the marker ends the response, so split on its last occurrence
+        head, marker, tail = response_text.rpartition('[ESCALATE:')
+        if not marker:
+            return {
+                'content': response_text,
+                'escalate': False,
+                'escalation_reason': ''
+            }
+        
+        reason, closed, _ = tail.partition(']')
+        return {
+            'content': head.strip(),
+            'escalate': True,
+            'escalation_reason': reason.strip() if closed else 'unknown'
+        }
+    
     def get_non_streaming_response(self, user_message, error_code, conversation_history):
         """Get AI response without streaming (alternative method)"""
         try:
@@ -123,60 +141,20 @@ Response format should be conversational and helpful. If escalation is needed, e
                     'escalation_reason': 'ai_unavailable'
                 }
             
-            # Build conversation context
-            context = self._build_context(error_code, conversation_history)
-            
-            # Create the complete prompt
-            full_prompt = f"""
-{context}
-
-User message: {user_message}
-
-Please respond as a helpful technical support assistant. If the user is having trouble with solution steps, provide detailed guidance. If the solution didn't work, ask clarifying questions and suggest alternatives. If the issue seems too complex or you cannot help further, recommend escalation to human support.
-
-Response format should be conversational and helpful. If escalation is needed, end your response with [ESCALATE: reason].
-"""
-            
-            # Prepare contents for the API
-            contents = [
-                types.Content(
-                    role="user",
-                    parts=[
-                        types.Part.from_text(text=full_prompt),
-                    ],
-                ),
-            ]
-            
-            # Generate content configuration
-            generate_content_config = types.GenerateContentConfig(
-                temperature=self.config.GEMINI_TEMPERATURE,
-                max_output_tokens=self.config.GEMINI_MAX_TOKENS,
-            )
+            contents = self._build_contents(user_message, error_code, conversation_history)
             
             # Generate response (non-streaming)
             response = self.client.models.generate_content(
                 model=self.model,
                 contents=contents,
-                config=generate_content_config,
+                config=self._chat_config,
             )
             
             response_text = response.text if response.text else "I apologize, but I couldn't generate a response. Please try again or contact support."
             
-            # Check if escalation is needed
-            escalate = False
-            escalation_reason = ''
-            if '[ESCALATE:' in response_text:
-                escalate = True
-                escalation_reason = self._extract_escalation_reason(response_text)
-                response_text = response_text.split('[ESCALATE:')[0].strip()
-            
             logging.info(f"AI response generated for error {error_code}")
             
-            return {
-                'content': response_text,
-                'escalate': escalate,
-                'escalation_reason': escalation_reason
-            }
+            return self.parse_response(response_text)
             
         except Exception as e:
             logging.error(f"Error getting AI response: {str(e)}")
@@ -186,51 +164,43 @@ Response format should be conversational and helpful. If escalation is needed, e
                 'escalation_reason': 'ai_error'
             }
     
+    def _build_contents(self, user_message, error_code, conversation_history):
+        """Build the per-request contents; the static instructions go in the system instruction"""
+        context = self._build_context(error_code, conversation_history)
+        full_prompt = f"""
+{context}
+User message: {user_message}
+"""
+        return [
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_text(text=full_prompt),
+                ],
+            ),
+        ]
+    
     def _build_context(self, error_code, conversation_history):
         """Build context for AI conversation"""
-        context = f"""
-You are a Windows technical support chatbot helping users with dump file errors.
-
+        parts = [f"""
 Current Error: {error_code}
 
 Previous conversation:
-"""
+"""]
         
-        # Add conversation history (limit to last 10 messages for context window)
-        for msg in conversation_history[-10:]:
+        # Add the most recent messages that fit the token budget (~4 chars per token)
+        budget = self.config.GEMINI_MAX_CONTEXT_TOKENS
+        history = []
+        for msg in reversed(conversation_history):
             role = "User" if msg['role'] == 'user' else "Assistant"
-            context += f"{role}: {msg['content']}\n"
+            line = f"{role}: {msg['content']}\n"
+            budget -= len(line) // 4 + 1
+            if budget < 0:
+                break
+            history.append(line)
+        parts.extend(reversed(history))
         
-        context += """
-Guidelines:
-1. Be helpful and patient
-2. Provide step-by-step instructions when needed
-3. Ask clarifying questions if solution didn't work
-4. Escalate complex issues to human support
-5. Use simple, non-technical language when possible
-6. If you determine human support is needed, end your response with [ESCALATE: reason]
-
-Common escalation reasons:
-- complexity: Issue is too complex for automated assistance
-- solution_failed: Multiple solutions have failed
-- user_request: User explicitly requests human support
-- hardware_issue: Physical hardware problems requiring hands-on assistance
-- system_corruption: Severe system damage requiring advanced recovery
-"""
-        
-        return context
-    
-    def _extract_escalation_reason(self, content):
-        """Extract escalation reason from AI response"""
-        try:
-            escalate_marker = '[ESCALATE:'
-            start = content.find(escalate_marker) + len(escalate_marker)
-            end = content.find(']', start)
-            if end == -1:
-                return 'unknown'
-            return content[start:end].strip()
-        except Exception:
-            return 'unknown'
+        return "".join(parts)
     
     def generate_support_summary(self, conversation_history, error_code):
         """Generate summary for support ticket"""
@@ -1,228 +1,227 @@
 # utils/knowledge_base.py - Fixed version with proper error code matching
+import hashlib
 import json
 import os
+import re
+import sys
+import functools
 import logging
+import mmap
+from importlib import resources
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _read_json(path):
+    """Parse a JSON file, with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return orjson.loads(b'')  # mmap can't map an empty file
+            # Parse straight from the page cache instead of copying the file first
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return orjson.loads(memoryview(mm))
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def iter_journal(path):
+    """Yield the JSONL records appended by add_error, oldest first"""
+    try:
+        with open(path, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line) if ORJSON_AVAILABLE else json.loads(line)
+    except FileNotFoundError:
+        return
+
+def _append_jsonl(path, record):
+    """Append one record as a JSON line without rewriting the file"""
+    if ORJSON_AVAILABLE:
+        line = orjson.dumps(record, option=orjson.OPT_NON_STR_KEYS) + b'\n'
+    else:
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+    with open(path, 'ab') as f:
+        f.write(line)
+
+def _mtime_ns(path):
+    """Modification time in ns, or 0 if the file doesn't exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+def _read_default_errors():
+    """Parse the seed knowledge base shipped in utils/data/default_errors.json"""
+    raw = (resources.files('utils') / 'data' / 'default_errors.json').read_bytes()
+    return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+
+def _write_json(path, data):
+    """Write data as indented UTF-8 JSON, with orjson when it is installed"""
+    if ORJSON_AVAILABLE:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+# Fields an entry needs for search_solutions to build its result
+_REQUIRED_FIELDS = frozenset(('error_code', 'error_name', 'description', 'category', 'confidence', 'solutions'))
+
+# Hex bug check code, with or without a 0x/0X prefix
+_HEX_CODE_RE = re.compile(r'(?:0[xX])?([0-9A-Fa-f]+)')
+
+def _normalize_code(error_code):
+    """Canonical form for matching ('0X' + upper-case hex, interned), or None if malformed"""
+    match = _HEX_CODE_RE.fullmatch(error_code.strip())
+    if not match:
+        return None
+    # Interned so index lookups of the same code compare by identity
+    return sys.intern('0X' + match.group(1).upper())
+
 class KnowledgeBase:
     def __init__(self):
         self.config = Config()
-        self.errors_db = self._load_knowledge_base()
+        self.errors_db, self._index = self._load_knowledge_base()
     
     def _load_knowledge_base(self):
         """Load error knowledge base from JSON file"""
         try:
-            if os.path.exists(self.config.KNOWLEDGE_BASE_PATH):
-                with open(self.config.KNOWLEDGE_BASE_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            else:
+            path = self.config.KNOWLEDGE_BASE_PATH
+            try:
+                # The stat doubles as the existence check
+                mtime_ns = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
                 # Create default knowledge base if it doesn't exist
                 default_kb = self._create_default_knowledge_base()
                 self._save_knowledge_base(default_kb)
-                return default_kb
+                return default_kb, self._build_index(default_kb)
+            
+            # Shared across instances until either file changes
+            journal = self.config.KNOWLEDGE_BASE_JOURNAL_PATH
+            return _load_cached(path, mtime_ns, journal, _mtime_ns(journal))
                 
         except Exception as e:
-            logging.error(f"Error loading knowledge base: {str(e)}")
-            return {"errors": []}
+            logger.error(f"Error loading knowledge base: {str(e)}")
+            return {"errors": []}, {}
     
-    def _create_default_knowledge_base(self):
-        """Create default knowledge base with common errors"""
+    @staticmethod
+    def _build_index(errors_db):
+        """Map each normalized stored error code to its search result"""
+        index = {}
+        errors = errors_db.get('errors', [])
+        if not isinstance(errors, list):
+            logger.error("Knowledge base 'errors' is not a list; ignoring it")
+            return index
+        
+        # Validate the shape once here so search_solutions needs no error handling
+        for error in errors:
+            if (not isinstance(error, dict) or not _REQUIRED_FIELDS.issubset(error)
+                    or not isinstance(error['error_code'], str)):
+                logger.warning("Skipping malformed knowledge base entry: %r", error)
+                continue
+            code = _normalize_code(error['error_code'])
+            if code is None:
+                logger.warning("Skipping knowledge base entry with malformed code: %r", error['error_code'])
+                continue
+            # setdefault keeps the first entry for a code, as the old linear scan did
+            index.setdefault(code, KnowledgeBase._search_result(error))
+        return index
+    
+    @staticmethod
+    def _search_result(error):
+        """Project an entry onto the fields search_solutions returns (built once, shared read-only)"""
         return {
-            "errors": [
-                {
-                    "error_code": "0x0000001E",
-                    "error_name": "KMODE_EXCEPTION_NOT_HANDLED",
-                    "description": "A kernel-mode program generated an exception which the error handler didn't catch",
-                    "category": "driver",
-                    "confidence": "high",
-                    "solutions": [
-                        {
-                            "step": 1,
-                            "description": "Update all device drivers through Device Manager",
-                            "details": "Press Win+X, select Device Manager, right-click devices with yellow warnings, select 'Update driver'"
-                        },
-                        {
-                            "step": 2,
-                            "description": "Run Windows Memory Diagnostic tool",
-                            "details": "Press Win+R, type 'mdsched.exe', restart when prompted"
-                        },
-                        {
-                            "step": 3,
-                            "description": "Check for hardware issues",
-                            "details": "Reseat RAM modules and check all cable connections"
-                        }
-                    ],
-                    "additional_info": "Often caused by faulty drivers or hardware",
-                    "gemini_context": "This error typically requires driver updates and memory testing. Be prepared to guide users through Device Manager navigation."
-                },
-                {
-                    "error_code": "0x0000007E",
-                    "error_name": "SYSTEM_THREAD_EXCEPTION_NOT_HANDLED",
-                    "description": "A system thread generated an exception which the error handler didn't catch",
-                    "category": "software",
-                    "confidence": "high",
-                    "solutions": [
-                        {
-                            "step": 1,
-                            "description": "Boot in Safe Mode",
-                            "details": "Hold Shift while clicking Restart, select Troubleshoot > Advanced Options > Startup Settings > Restart > F4"
-                        },
-                        {
-                            "step": 2,
-                            "description": "Uninstall recently installed software",
-                            "details": "Go to Settings > Apps & features, sort by install date, uninstall recent programs"
-                        },
-                        {
-                            "step": 3,
-                            "description": "Update BIOS/UEFI firmware",
-                            "details": "Visit manufacturer's website, download latest BIOS update for your motherboard model"
-                        }
-                    ],
-                    "additional_info": "Usually caused by incompatible software or outdated system firmware",
-                    "gemini_context": "Focus on recent software changes and system updates. Guide users through safe mode boot process."
-                },
-                {
-                    "error_code": "0x00000050",
-                    "error_name": "PAGE_FAULT_IN_NONPAGED_AREA",
-                    "description": "Invalid system memory references, usually indicating hardware problems",
-                    "category": "hardware",
-                    "confidence": "high",
-                    "solutions": [
-                        {
-                            "step": 1,
-                            "description": "Test RAM with MemTest86",
-                            "details": "Download MemTest86, create bootable USB, run full memory test overnight"
-                        },
-                        {
-                            "step": 2,
-                            "description": "Update system and device drivers",
-                            "details": "Use Windows Update and visit manufacturer websites for latest drivers"
-                        },
-                        {
-                            "step": 3,
-                            "description": "Run full system scan for malware",
-                            "details": "Use Windows Defender full scan or reputable antivirus software"
-                        }
-                    ],
-                    "additional_info": "Often indicates failing RAM or storage devices",
-                    "gemini_context": "This is typically a hardware issue. Help users understand memory testing procedures and hardware diagnostics."
-                },
-                {
-                    "error_code": "0x0000000A",
-                    "error_name": "IRQL_NOT_LESS_OR_EQUAL",
-                    "description": "A kernel-mode process or driver attempted to access memory at too high an IRQL",
-                    "category": "driver",
-                    "confidence": "high",
-                    "solutions": [
-                        {
-                            "step": 1,
-                            "description": "Remove recently installed hardware",
-                            "details": "Disconnect USB devices, remove new expansion cards, restore to previous hardware configuration"
-                        },
-                        {
-                            "step": 2,
-                            "description": "Update network and graphics drivers",
-                            "details": "Visit AMD/NVIDIA/Intel websites for graphics drivers, router manufacturer for network drivers"
-                        },
-                        {
-                            "step": 3,
-                            "description": "Temporarily disable antivirus software",
-                            "details": "Right-click antivirus system tray icon, select disable protection temporarily"
-                        }
-                    ],
-                    "additional_info": "Usually caused by faulty drivers, especially network or graphics drivers",
-                    "gemini_context": "Focus on driver conflicts and recent hardware changes. Help users identify problematic drivers."
-                },
-                {
-                    "error_code": "0x000000EF",
-                    "error_name": "CRITICAL_PROCESS_DIED",
-                    "description": "A critical system process terminated unexpectedly",
-                    "category": "system",
-                    "confidence": "high",
-                    "solutions": [
-                        {
-                            "step": 1,
-                            "description": "Run System File Checker",
-                            "details": "Open Command Prompt as administrator, run 'sfc /scannow', wait for completion"
-                        },
-                        {
-                            "step": 2,
-                            "description": "Reset Windows Update components",
-                            "details": "Run 'net stop wuauserv', 'net stop cryptSvc', 'net stop bits', then restart these services"
-                        },
-                        {
-                            "step": 3,
-                            "description": "Perform System Restore",
-                            "details": "Type 'rstrui.exe' in Run dialog, select restore point before the issue started"
-                        }
-                    ],
-                    "additional_info": "Indicates corruption in critical Windows processes or files",
-                    "gemini_context": "This is a serious system integrity issue. Guide users through system repair procedures carefully."
-                }
-            ]
+            'error_code': error['error_code'],
+            'error_name': error['error_name'],
+            'description': error['description'],
+            'category': error['category'],
+            'confidence': error['confidence'],
+            'solutions': error['solutions'],
+            'additional_info': error.get('additional_info', ''),
+            'gemini_context': error.get('gemini_context', '')
         }
     
+    def _create_default_knowledge_base(self):
+        """Create default knowledge base with common errors"""
+        return _read_default_errors()
+    
     def _save_knowledge_base(self, data):
         """Save knowledge base to JSON file"""
         try:
             os.makedirs(os.path.dirname(self.config.KNOWLEDGE_BASE_PATH), exist_ok=True)
-            with open(self.config.KNOWLEDGE_BASE_PATH, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            logging.info("Knowledge base saved successfully")
+            _write_json(self.config.KNOWLEDGE_BASE_PATH, data)
+            logger.info("Knowledge base saved successfully")
         except Exception as e:
-            logging.error(f"Error saving knowledge base: {str(e)}")
+            logger.error(f"Error saving knowledge base: {str(e)}")
     
     def search_solutions(self, error_code):
         """Search for solutions based on error code - FIXED VERSION"""
-        try:
-            if not error_code:
-                logging.warning("No error code provided for solution search")
-                return None
-            
-            # Clean and normalize error code
-            clean_code = error_code.strip().upper()
-            if not clean_code.startswith('0X'):
-                if clean_code.startswith('0x'):
-                    clean_code = clean_code.replace('0x', '0X')
-                else:
-                    clean_code = f"0X{clean_code}"
-            
-            logging.info(f"Searching for solutions for error code: {clean_code}")
-            
-            # Search through all errors in database
-            for error in self.errors_db.get('errors', []):
-                stored_code = error.get('error_code', '').strip().upper()
-                logging.debug(f"Comparing {clean_code} with {stored_code}")
-                
-                if stored_code == clean_code:
-                    logging.info(f"Found solution for error code: {clean_code}")
-                    return {
-                        'error_code': error['error_code'],
-                        'error_name': error['error_name'],
-                        'description': error['description'],
-                        'category': error['category'],
-                        'confidence': error['confidence'],
-                        'solutions': error['solutions'],
-                        'additional_info': error.get('additional_info', ''),
-                        'gemini_context': error.get('gemini_context', '')
-                    }
-            
-            logging.warning(f"No solution found for error code: {clean_code}")
+        if not error_code:
+            logger.warning("No error code provided for solution search")
             return None
-            
-        except Exception as e:
-            logging.error(f"Error searching knowledge base: {str(e)}")
+        
+        clean_code = _normalize_code(error_code)
+        if clean_code is None:
+            logger.warning("Malformed error code for solution search: %r", error_code)
             return None
+        
+        logger.info("Searching for solutions for error code: %s", clean_code)
+        
+        result = self._index.get(clean_code)
+        if result is not None:
+            logger.info("Found solution for error code: %s", clean_code)
+            return result
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Known error codes: %s", list(self._index))
+        logger.warning("No solution found for error code: %s", clean_code)
+        return None
+    
+    def search_solutions_many(self, error_codes):
+        """Search a batch of error codes, returning a result or None for each"""
+        index = self._index
+        results = [index.get(_normalize_code(code)) if code else None for code in error_codes]
+        # One summary line instead of search_solutions' per-code logging
+        logger.info("Searched %d error codes, found %d", len(results),
+                    sum(result is not None for result in results))
+        return results
+    
+    @staticmethod
+    def clear_cache():
+        """Forget the shared parsed file so the next instance reads it again"""
+        _load_cached.cache_clear()
     
     def add_error(self, error_data):
         """Add new error to knowledge base"""
         try:
+            # One appended line instead of re-encoding the whole file
+            _append_jsonl(self.config.KNOWLEDGE_BASE_JOURNAL_PATH, error_data)
             self.errors_db['errors'].append(error_data)
-            self._save_knowledge_base(self.errors_db)
+            code = _normalize_code(error_data.get('error_code', ''))
+            if code is not None:
+                self._index.setdefault(code, self._search_result(error_data))
+            self.clear_cache()
             return True
         except Exception as e:
-            logging.error(f"Error adding error to knowledge base: {str(e)}")
+            logger.error(f"Error adding error to knowledge base: {str(e)}")
+            return False
+    
+    def compact_journal(self):
+        """Fold the add_error journal into the JSON file and remove it"""
+        journal = self.config.KNOWLEDGE_BASE_JOURNAL_PATH
+        if not os.path.exists(journal):
             return False
+        self._save_knowledge_base(self.errors_db)
+        os.remove(journal)
+        self.clear_cache()
+        logger.info("Knowledge base journal compacted")
+        return True
     
     def get_all_errors(self):
         """Get all errors from knowledge base"""
@@ -230,9 +229,33 @@ class KnowledgeBase:
     
     def debug_print_all_codes(self):
         """Debug method to print all error codes in database"""
-        logging.info("All error codes in knowledge base:")
+        logger.info("All error codes in knowledge base:")
         for error in self.errors_db.get('errors', []):
-            logging.info(f"  - {error.get('error_code', 'NO_CODE')}: {error.get('error_name', 'NO_NAME')}")
+            logger.info(f"  - {error.get('error_code', 'NO_CODE')}: {error.get('error_name', 'NO_NAME')}")
+
+@functools.lru_cache(maxsize=4)
+def _load_cached(path, mtime_ns, journal, journal_mtime_ns):
+    """Parse and index the knowledge base; the mtimes in the key pick up edits"""
+    errors_db = _load_compiled(path) or _read_json(path)
+    # Always a new list, so add_error never appends into the compiled module
+    errors = errors_db.get('errors', [])
+    if isinstance(errors, list):
+        errors_db = {**errors_db, 'errors': errors + list(iter_journal(journal))}
+    return errors_db, KnowledgeBase._build_index(errors_db)
+
+def _load_compiled(path):
+    """Return the build_kb.py output if it was generated from the current file"""
+    try:
+        from . import _kb_data
+    except ImportError:
+        return None
+    
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    if digest != _kb_data.SOURCE_SHA256:
+        logger.info("Compiled knowledge base is stale; re-run build_kb.py")
+        return None
+    return _kb_data.ERRORS_DB
 
 # Create the knowledge base JSON file if it doesn't exist
 def create_knowledge_base_file():
@@ -248,66 +271,10 @@ def create_knowledge_base_file():
         return
     
     # Create the knowledge base data
-    kb_data = {
-        "errors": [
-            {
-                "error_code": "0x0000001E",
-                "error_name": "KMODE_EXCEPTION_NOT_HANDLED",
-                "description": "A kernel-mode program generated an exception which the error handler didn't catch",
-                "category": "driver",
-                "confidence": "high",
-                "solutions": [
-                    {
-                        "step": 1,
-                        "description": "Update all device drivers through Device Manager",
-                        "details": "Press Win+X, select Device Manager, right-click devices with yellow warnings, select 'Update driver'"
-                    },
-                    {
-                        "step": 2,
-                        "description": "Run Windows Memory Diagnostic tool",
-                        "details": "Press Win+R, type 'mdsched.exe', restart when prompted"
-                    },
-                    {
-                        "step": 3,
-                        "description": "Check for hardware issues",
-                        "details": "Reseat RAM modules and check all cable connections"
-                    }
-                ],
-                "additional_info": "Often caused by faulty drivers or hardware",
-                "gemini_context": "This error typically requires driver updates and memory testing."
-            },
-            {
-                "error_code": "0x00000050",
-                "error_name": "PAGE_FAULT_IN_NONPAGED_AREA",
-                "description": "Invalid system memory references, usually indicating hardware problems",
-                "category": "hardware",
-                "confidence": "high",
-                "solutions": [
-                    {
-                        "step": 1,
-                        "description": "Test RAM with MemTest86",
-                        "details": "Download MemTest86, create bootable USB, run full memory test overnight"
-                    },
-                    {
-                        "step": 2,
-                        "description": "Update system and device drivers",
-                        "details": "Use Windows Update and visit manufacturer websites for latest drivers"
-                    },
-                    {
-                        "step": 3,
-                        "description": "Run full system scan for malware",
-                        "details": "Use Windows Defender full scan or reputable antivirus software"
-                    }
-                ],
-                "additional_info": "Often indicates failing RAM or storage devices",
-                "gemini_context": "This is typically a hardware issue. Help users understand memory testing."
-            }
-        ]
-    }
+    kb_data = _read_default_errors()
     
     # Write the file
-    with open(kb_path, 'w', encoding='utf-8') as f:
-        json.dump(kb_data, f, indent=2, ensure_ascii=False)
+    _write_json(kb_path, kb_data)
     
     print(f"Knowledge base file created at {kb_path}")
 
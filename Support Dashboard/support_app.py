@@ -1,17 +1,35 @@
 # support_app.py - Support Dashboard Application (Phase 2)
-from flask import Flask, render_template, request, jsonify, session, flash, redirect, url_for
+from flask import Flask, render_template, request, jsonify, session, flash, redirect, url_for, g, has_app_context
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import select, exists, func, event, update, insert, inspect, text, tuple_
+from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.exc import SQLAlchemyError
 from werkzeug.security import generate_password_hash, check_password_hash
 import os
 import json
 import logging
+import functools
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from cachelib import SimpleCache
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 
 # Configuration
@@ -30,12 +48,82 @@ app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['CLIENT_API_URL'] = os.getenv('CLIENT_API_URL', 'http://localhost:5000/api')
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to Flask's default for other types"""
+    
+    def dumps(self, obj, **kwargs):
+        # Pass datetimes through so they keep Flask's HTTP date format
+        return orjson.dumps(
+            obj,
+            default=self.default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+# jsonify on /api/stats and the client app hooks goes through this too
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
+
 # Initialize extensions
 db = SQLAlchemy(app)
+
+def _sqlite_pragmas(dbapi_conn, connection_record):
+    """Use WAL so stats polls don't wait behind ticket writes from either app"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.close()
+
+with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        event.listen(db.engine, 'connect', _sqlite_pragmas)
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Calls to the client app run here so they never block a request
+client_executor = ThreadPoolExecutor(max_workers=4)
+
+# Shared HTTP session so connections to the client app are reused
+CLIENT_HTTP = requests.Session()
+_client_adapter = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.1)
+)
+CLIENT_HTTP.mount('https://', _client_adapter)
+CLIENT_HTTP.mount('http://', _client_adapter)
+
+# (connect, read) seconds; a client app that isn't up fails fast
+CLIENT_API_TIMEOUT = (1, 5)
+
+# Dashboard auto-refresh polls the stats; a few seconds of staleness is fine
+stats_cache = SimpleCache(default_timeout=5)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_stats(sess):
+    """Any committed ticket change may move the counts"""
+    stats_cache.delete('ticket_status_counts')
+
+@event.listens_for(db.session, 'after_commit')
+def _dispatch_client_app_updates(sess):
+    """Send the client app updates queued by this request once they are committed"""
+    if has_app_context():
+        for update_args in g.pop('client_app_updates', ()):
+            client_executor.submit(sync_client_app, *update_args)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _drop_client_app_updates(sess, previous_transaction):
+    """A rolled back change must not reach the client app"""
+    if has_app_context():
+        g.pop('client_app_updates', None)
+
 
 # Support Staff Model
 class SupportStaff(db.Model):
@@ -50,6 +138,8 @@ class SupportStaff(db.Model):
     last_assigned = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    assigned_tickets = db.relationship('SupportTicket', back_populates='assigned_staff')
+    
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
     
@@ -71,6 +161,11 @@ class SupportStaff(db.Model):
 # Create a local Ticket model that mirrors the client app's structure
 class SupportTicket(db.Model):
     __tablename__ = 'tickets'
+    __table_args__ = (
+        # Serve the tickets list filters together with its newest-first order
+        db.Index('ix_ticket_status_created', 'status', 'created_at'),
+        db.Index('ix_ticket_assigned_created', 'assigned_to', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     ticket_id = db.Column(db.String(20), unique=True, nullable=False, index=True)
@@ -94,13 +189,11 @@ class SupportTicket(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relationship
-    assigned_staff = db.relationship('SupportStaff', backref='assigned_tickets')
-    
-    @property
-    def user(self):
-        """Get user info for this ticket"""
-        return ClientUser.query.get(self.user_id)
+    # Relationships
+    assigned_staff = db.relationship('SupportStaff', back_populates='assigned_tickets')
+    # users belongs to the client app, so there is no foreign key to join on
+    user = db.relationship('ClientUser', primaryjoin='foreign(SupportTicket.user_id) == ClientUser.id',
+                           viewonly=True)
     
     @property
     def username(self):
@@ -121,48 +214,127 @@ class ClientUser(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    system_config = db.Column(db.Text, nullable=True)
+    # Same column type as the client app's User.system_config
+    system_config = db.Column(db.JSON().with_variant(JSONB(), 'postgresql'), nullable=True)
     
     def get_system_config_dict(self):
-        if self.system_config:
-            try:
-                import json
-                return json.loads(self.system_config)
-            except:
-                return {}
-        return {}
+        if not self.system_config:
+            return {}
+        if isinstance(self.system_config, dict):
+            return self.system_config
+        # Text left over from before the column was JSON
+        try:
+            return json.loads(self.system_config)
+        except (ValueError, TypeError):
+            return {}
+
+# Columns the tickets list renders; the description is cut to the preview length
+TICKET_LIST_COLUMNS = (
+    SupportTicket.id,
+    SupportTicket.ticket_id,
+    SupportTicket.title,
+    func.substr(SupportTicket.description, 1, 201).label('description'),
+    SupportTicket.error_code,
+    SupportTicket.priority,
+    SupportTicket.status,
+    SupportTicket.created_at,
+    ClientUser.username.label('username'),
+    SupportStaff.username.label('assigned_username'),
+)
 
 @login_manager.user_loader
 def load_user(user_id):
-    return SupportStaff.query.get(int(user_id))
+    return db.session.get(SupportStaff, int(user_id))
+
+# Statuses an agent may set from the ticket page
+TICKET_STATUSES = frozenset({'open', 'in_progress', 'pending_user', 'resolved', 'closed'})
 
 # Round-robin assignment logic
 def get_next_available_agent():
     """Get next available agent using round-robin"""
-    available_agents = SupportStaff.query.filter_by(
+    # last_assigned is the round-robin pointer; only the least recent agent is needed
+    return SupportStaff.query.filter_by(
         role='agent', 
         is_available=True
-    ).order_by(SupportStaff.last_assigned.asc().nullsfirst()).all()
-    
-    if available_agents:
-        return available_agents[0]
-    return None
+    ).order_by(SupportStaff.last_assigned.asc().nullsfirst()).first()
 
-def assign_ticket_round_robin(ticket):
-    """Assign ticket using round-robin algorithm"""
+def assign_ticket_round_robin(ticket_id):
+    """Assign an unassigned ticket using round-robin algorithm.
+    
+    Returns the agent, or None if no agent is available or the ticket is
+    missing or already assigned.
+    """
     agent = get_next_available_agent()
     if agent:
-        ticket.assigned_to = agent.id
-        ticket.assigned_at = datetime.utcnow()
-        ticket.status = 'in_progress'
-        agent.last_assigned = datetime.utcnow()
-        
-        db.session.commit()
-        
-        logging.info(f"Ticket {ticket.ticket_id} assigned to {agent.username}")
-        return agent
+        now = datetime.utcnow()
+        # The assigned_to IS NULL guard keeps two deliveries from both assigning it
+        assigned = db.session.execute(
+            update(SupportTicket)
+            .where(SupportTicket.ticket_id == ticket_id, SupportTicket.assigned_to.is_(None))
+            .values(assigned_to=agent.id, assigned_at=now, status='in_progress')
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if assigned:
+            agent.last_assigned = now
+            db.session.commit()
+            
+            logger.info("Ticket %s assigned to %s", ticket_id, agent.username)
+            return agent
     return None
 
+# Per-status ticket counts kept current by triggers, so reading them doesn't
+# scan the tickets table. Both apps write tickets, hence triggers over app code.
+TICKET_COUNTERS_DDL = (
+    "CREATE TABLE ticket_counters (status TEXT PRIMARY KEY, n INTEGER NOT NULL DEFAULT 0)",
+    "INSERT INTO ticket_counters (status, n) "
+    "SELECT status, COUNT(*) FROM tickets WHERE status IS NOT NULL GROUP BY status",
+    """CREATE TRIGGER ticket_counters_insert AFTER INSERT ON tickets WHEN NEW.status IS NOT NULL
+    BEGIN
+        INSERT OR IGNORE INTO ticket_counters (status, n) VALUES (NEW.status, 0);
+        UPDATE ticket_counters SET n = n + 1 WHERE status = NEW.status;
+    END""",
+    """CREATE TRIGGER ticket_counters_update AFTER UPDATE OF status ON tickets
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        UPDATE ticket_counters SET n = n - 1 WHERE status = OLD.status;
+        INSERT OR IGNORE INTO ticket_counters (status, n) SELECT NEW.status, 0 WHERE NEW.status IS NOT NULL;
+        UPDATE ticket_counters SET n = n + 1 WHERE status = NEW.status;
+    END""",
+    """CREATE TRIGGER ticket_counters_delete AFTER DELETE ON tickets WHEN OLD.status IS NOT NULL
+    BEGIN
+        UPDATE ticket_counters SET n = n - 1 WHERE status = OLD.status;
+    END""",
+)
+
+@functools.cache
+def has_ticket_counters():
+    """Whether create_tables has set up ticket_counters (SQLite only)"""
+    return db.engine.dialect.name == 'sqlite' and inspect(db.engine).has_table('ticket_counters')
+
+def create_ticket_counters():
+    """Create, seed and wire up ticket_counters in one transaction"""
+    if db.engine.dialect.name != 'sqlite' or inspect(db.engine).has_table('ticket_counters'):
+        return
+    for statement in TICKET_COUNTERS_DDL:
+        db.session.execute(text(statement))
+    db.session.commit()
+    has_ticket_counters.cache_clear()
+    logger.info("Ticket counters created")
+
+def ticket_status_counts():
+    """Ticket count per status, cached briefly"""
+    counts = stats_cache.get('ticket_status_counts')
+    if counts is None:
+        if has_ticket_counters():
+            rows = db.session.execute(text("SELECT status, n FROM ticket_counters")).all()
+        else:
+            rows = db.session.execute(
+                select(SupportTicket.status, func.count(SupportTicket.id)).group_by(SupportTicket.status)
+            ).all()
+        counts = dict(rows)
+        stats_cache.set('ticket_status_counts', counts)
+    return counts
+
 # Authentication Routes
 @app.route('/login', methods=['GET', 'POST'])
 def login():
@@ -192,17 +364,20 @@ def logout():
 def dashboard():
     try:
         # Get ticket statistics
-        total_tickets = SupportTicket.query.count()
-        open_tickets = SupportTicket.query.filter_by(status='open').count()
+        counts = ticket_status_counts()
+        total_tickets = sum(counts.values())
+        open_tickets = counts.get('open', 0)
         assigned_tickets = SupportTicket.query.filter_by(assigned_to=current_user.id).count()
-        resolved_tickets = SupportTicket.query.filter_by(status='resolved').count()
+        resolved_tickets = counts.get('resolved', 0)
         
         # Get recent tickets for current user
-        my_tickets = SupportTicket.query.filter_by(assigned_to=current_user.id)\
+        my_tickets = SupportTicket.query.options(joinedload(SupportTicket.user))\
+                                       .filter_by(assigned_to=current_user.id)\
                                        .order_by(SupportTicket.updated_at.desc()).limit(5).all()
         
         # Get unassigned tickets (for managers)
-        unassigned_tickets = SupportTicket.query.filter_by(assigned_to=None)\
+        unassigned_tickets = SupportTicket.query.options(joinedload(SupportTicket.user))\
+                                               .filter_by(assigned_to=None)\
                                                .order_by(SupportTicket.created_at.asc()).limit(10).all()
         
         return render_template('dashboard.html',
@@ -212,8 +387,9 @@ def dashboard():
                              resolved_tickets=resolved_tickets,
                              my_tickets=my_tickets,
                              unassigned_tickets=unassigned_tickets)
-    except Exception as e:
-        logging.error(f"Dashboard error: {str(e)}")
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Dashboard error: %s", e)
         flash('Error loading dashboard', 'error')
         return render_template('dashboard.html',
                              total_tickets=0,
@@ -226,6 +402,7 @@ def dashboard():
 @app.route('/tickets')
 @login_required
 def tickets():
+    per_page = 50
     status_filter = request.args.get('status', '')
     assigned_filter = request.args.get('assigned', '')
     
@@ -239,23 +416,48 @@ def tickets():
     elif assigned_filter == 'unassigned':
         query = query.filter_by(assigned_to=None)
     
-    tickets = query.order_by(SupportTicket.created_at.desc()).all()
+    # Keyset pagination: continue after the last ticket of the previous page,
+    # so older pages don't have to skip over every newer row
+    after_created_at = request.args.get('after_created_at', '')
+    after_id = request.args.get('after_id', type=int)
+    if after_created_at and after_id:
+        try:
+            cursor = (datetime.fromisoformat(after_created_at), after_id)
+            query = query.filter(tuple_(SupportTicket.created_at, SupportTicket.id) < cursor)
+        except ValueError:
+            after_id = None
+    
+    # Plain rows with just what the list shows, user and agent names joined in
+    rows = query.outerjoin(ClientUser, ClientUser.id == SupportTicket.user_id)\
+                .outerjoin(SupportStaff, SupportStaff.id == SupportTicket.assigned_to)\
+                .with_entities(*TICKET_LIST_COLUMNS)\
+                .order_by(SupportTicket.created_at.desc(), SupportTicket.id.desc())\
+                .limit(per_page + 1).all()
+    tickets = rows[:per_page]
+    
+    next_cursor = None
+    if len(rows) > per_page:
+        next_cursor = {'after_created_at': tickets[-1].created_at.isoformat(), 'after_id': tickets[-1].id}
     
     return render_template('tickets.html', tickets=tickets, 
-                         status_filter=status_filter, assigned_filter=assigned_filter)
+                         status_filter=status_filter, assigned_filter=assigned_filter,
+                         next_cursor=next_cursor, is_first_page=not after_id)
 
 @app.route('/ticket/<ticket_id>')
 @login_required
 def view_ticket(ticket_id):
     try:
-        ticket = SupportTicket.query.filter_by(ticket_id=ticket_id).first_or_404()
+        ticket = SupportTicket.query.options(joinedload(SupportTicket.user),
+                                             joinedload(SupportTicket.assigned_staff))\
+                                    .filter_by(ticket_id=ticket_id).first_or_404()
         
         # Get user info
-        user = ClientUser.query.get(ticket.user_id)
+        user = ticket.user
         
         return render_template('view_ticket.html', ticket=ticket, user=user)
-    except Exception as e:
-        logging.error(f"Error viewing ticket {ticket_id}: {str(e)}")
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error viewing ticket %s: %s", ticket_id, e)
         flash('Error loading ticket details', 'error')
         return redirect(url_for('tickets'))
 
@@ -266,24 +468,27 @@ def assign_ticket(ticket_id):
     
     if current_user.role == 'manager':
         # Manager can assign to specific agent
-        agent_id = request.form.get('agent_id')
+        agent_id = request.form.get('agent_id', type=int)
         if agent_id:
-            agent = SupportStaff.query.get(agent_id)
+            # Served from the identity map when it's the signed-in manager
+            agent = db.session.get(SupportStaff, agent_id)
             if agent:
+                now = datetime.utcnow()
                 ticket.assigned_to = agent.id
-                ticket.assigned_at = datetime.utcnow()
+                ticket.assigned_at = now
                 ticket.status = 'in_progress'
-                agent.last_assigned = datetime.utcnow()
+                agent.last_assigned = now
                 
                 db.session.commit()
                 flash(f'Ticket assigned to {agent.username}', 'success')
     else:
         # Regular assignment (round-robin or self-assign)
         if not ticket.assigned_to:
+            now = datetime.utcnow()
             ticket.assigned_to = current_user.id
-            ticket.assigned_at = datetime.utcnow()
+            ticket.assigned_at = now
             ticket.status = 'in_progress'
-            current_user.last_assigned = datetime.utcnow()
+            current_user.last_assigned = now
             
             db.session.commit()
             flash('Ticket assigned to you', 'success')
@@ -298,26 +503,37 @@ def update_ticket_status(ticket_id):
     new_status = request.form.get('status')
     solution = request.form.get('solution', '')
     
-    if new_status in ['open', 'in_progress', 'pending_user', 'resolved', 'closed']:
+    if new_status in TICKET_STATUSES:
+        now = datetime.utcnow()
         ticket.status = new_status
-        ticket.updated_at = datetime.utcnow()
+        ticket.updated_at = now
         
+        # Update knowledge base if solution provided
+        kb_solution = None
         if new_status == 'resolved' and solution:
             ticket.solution = solution
-            ticket.resolved_at = datetime.utcnow()
-            
-            # Update knowledge base if solution provided
-            update_knowledge_base(ticket.error_code, solution)
+            ticket.resolved_at = now
+            kb_solution = solution
         
+        # Tell the client app in the background once the commit succeeds, with
+        # plain values since the ORM object must not cross threads
+        g.setdefault('client_app_updates', []).append((ticket.ticket_id, ticket.error_code, kb_solution, {
+            'status': new_status,
+            'solution': ticket.solution,
+            'updated_at': now.isoformat()
+        }))
         db.session.commit()
         
-        # Notify client app
-        notify_client_app(ticket)
-        
         flash(f'Ticket status updated to {new_status}', 'success')
     
     return redirect(url_for('view_ticket', ticket_id=ticket_id))
 
+def sync_client_app(ticket_id, error_code, kb_solution, status_update):
+    """Push a resolved solution and the new ticket status to the client app"""
+    if kb_solution:
+        update_knowledge_base(error_code, kb_solution)
+    notify_client_app(ticket_id, status_update)
+
 def update_knowledge_base(error_code, solution):
     """Update knowledge base with new solution"""
     if not error_code or not solution:
@@ -325,49 +541,52 @@ def update_knowledge_base(error_code, solution):
     
     try:
         # Call client app API to update knowledge base
-        requests.post(f"{app.config['CLIENT_API_URL']}/knowledge_base/update", 
-                     json={
-                         'error_code': error_code,
-                         'solution': solution,
-                         'source': 'support_dashboard'
-                     }, timeout=5)
-    except Exception as e:
-        logging.error(f"Failed to update knowledge base: {e}")
-
-def notify_client_app(ticket):
+        CLIENT_HTTP.post(f"{app.config['CLIENT_API_URL']}/knowledge_base/update",
+                        json={
+                            'error_code': error_code,
+                            'solution': solution,
+                            'source': 'support_dashboard'
+                        }, timeout=CLIENT_API_TIMEOUT)
+    except requests.RequestException as e:
+        logger.error("Failed to update knowledge base: %s", e)
+
+def notify_client_app(ticket_id, status_update):
     """Notify client app of ticket updates"""
     try:
-        requests.put(f"{app.config['CLIENT_API_URL']}/tickets/{ticket.ticket_id}/status",
-                    json={
-                        'status': ticket.status,
-                        'solution': ticket.solution,
-                        'updated_at': ticket.updated_at.isoformat()
-                    }, timeout=5)
-    except Exception as e:
-        logging.error(f"Failed to notify client app: {e}")
+        CLIENT_HTTP.put(f"{app.config['CLIENT_API_URL']}/tickets/{ticket_id}/status",
+                        json=status_update, timeout=CLIENT_API_TIMEOUT)
+    except requests.RequestException as e:
+        logger.error("Failed to notify client app: %s", e)
 
 # API Routes (for client app communication)
 @app.route('/api/tickets', methods=['POST'])
 def receive_ticket():
     """Receive new ticket from client app - tickets are already in shared database"""
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
+    ticket_id = data.get('ticket_id')
+    if not ticket_id:
+        return jsonify({"status": "error", "message": "ticket_id is required"}), 400
     
     try:
-        # Find the existing ticket that was just created in the client app
-        ticket = SupportTicket.query.filter_by(ticket_id=data['ticket_id']).first()
+        # Auto-assign the ticket the client app just created using round-robin
+        if assign_ticket_round_robin(ticket_id):
+            logger.info("Ticket found and assigned: %s", ticket_id)
+            return jsonify({"status": "success", "ticket_id": ticket_id}), 201
         
-        if ticket:
-            # Auto-assign using round-robin
-            assign_ticket_round_robin(ticket)
-            
-            logging.info(f"Ticket found and assigned: {ticket.ticket_id}")
-            return jsonify({"status": "success", "ticket_id": ticket.ticket_id}), 201
+        # No agent free or already assigned; only a missing ticket is an error
+        ticket_exists = db.session.scalar(
+            select(exists().where(SupportTicket.ticket_id == ticket_id))
+        )
+        if ticket_exists:
+            logger.info("Ticket found, not assigned now: %s", ticket_id)
+            return jsonify({"status": "success", "ticket_id": ticket_id}), 201
         else:
-            logging.error(f"Ticket not found in database: {data['ticket_id']}")
+            logger.error("Ticket not found in database: %s", ticket_id)
             return jsonify({"status": "error", "message": "Ticket not found"}), 404
         
-    except Exception as e:
-        logging.error(f"Error processing ticket: {e}")
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error processing ticket %s: %s", ticket_id, e)
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/api/tickets/<ticket_id>/user_update', methods=['PUT'])
@@ -389,15 +608,21 @@ def handle_user_update(ticket_id):
 @app.route('/api/stats')
 def api_stats():
     """API endpoint for dashboard statistics"""
+    counts = ticket_status_counts()
     stats = {
-        'total_tickets': SupportTicket.query.count(),
-        'open_tickets': SupportTicket.query.filter_by(status='open').count(),
-        'in_progress': SupportTicket.query.filter_by(status='in_progress').count(),
-        'resolved_tickets': SupportTicket.query.filter_by(status='resolved').count(),
+        'total_tickets': sum(counts.values()),
+        'open_tickets': counts.get('open', 0),
+        'in_progress': counts.get('in_progress', 0),
+        'resolved_tickets': counts.get('resolved', 0),
         'available_agents': SupportStaff.query.filter_by(role='agent', is_available=True).count()
     }
     
-    return jsonify(stats)
+    # Tagging the payload lets an unchanged poll get a bodiless 304. A counter
+    # bumped on commit would miss tickets written by the client app.
+    response = jsonify(stats)
+    response.add_etag()
+    response.cache_control.max_age = 2
+    return response.make_conditional(request)
     
 # Function removed - not needed in support dashboard
 # Initialize database
@@ -405,33 +630,30 @@ def api_stats():
 def create_tables():
     db.create_all()
     
+    # The tickets table is usually created by the client app, and create_all
+    # skips existing tables, so add this model's indexes separately
+    for index in SupportTicket.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    create_ticket_counters()
+    
     # Create default admin user if not exists
-    if not SupportStaff.query.filter_by(username='admin').first():
-        admin = SupportStaff(
-            username='admin',
-            email='admin@support.com',
-            role='manager'
-        )
-        admin.set_password('admin123')
-        
-        agent1 = SupportStaff(
-            username='agent1',
-            email='agent1@support.com',
-            role='agent'
-        )
-        agent1.set_password('agent123')
-        
-        agent2 = SupportStaff(
-            username='agent2',
-            email='agent2@support.com',
-            role='agent'
-        )
-        agent2.set_password('agent123')
-        
-        db.session.add_all([admin, agent1, agent2])
+    # EXISTS lets the database stop at the first match without loading a row
+    admin_exists = db.session.scalar(
+        select(exists().where(SupportStaff.username == 'admin'))
+    )
+    if not admin_exists:
+        # One executemany INSERT; each account still gets its own salted hash
+        db.session.execute(insert(SupportStaff), [
+            {'username': 'admin', 'email': 'admin@support.com', 'role': 'manager',
+             'password_hash': generate_password_hash('admin123')},
+            {'username': 'agent1', 'email': 'agent1@support.com', 'role': 'agent',
+             'password_hash': generate_password_hash('agent123')},
+            {'username': 'agent2', 'email': 'agent2@support.com', 'role': 'agent',
+             'password_hash': generate_password_hash('agent123')},
+        ])
         db.session.commit()
         
-        logging.info("Default support staff created")
+        logger.info("Default support staff created")
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)